@@ -2,8 +2,10 @@
 照片管理API
 """
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, BackgroundTasks
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Tuple
+import io
 import os
 import uuid
 from datetime import datetime
@@ -18,9 +20,13 @@ from app.core.exceptions import NotFoundError, FileError, ValidationError
 from app.core.security import get_current_user_id
 from app.services.photo_service import PhotoService
 from app.services.ai_service import AIService
+from app.services.thumbnail_service import ThumbnailService
 
 router = APIRouter()
 
+# 缩略图按 photo_id 寻址且需要登录，只允许浏览器私有缓存，禁止CDN/共享缓存存储
+THUMBNAIL_CACHE_HEADERS = {"Cache-Control": "private, max-age=86400"}
+
 
 @router.post("/upload", response_model=UploadResponse)
 async def upload_photo(
@@ -172,6 +178,44 @@ async def upload_photo(
         raise FileError(f"上传失败: {str(e)}")
 
 
+# 批量上传允许的扩展名与单个文件大小上限
+ALLOWED_UPLOAD_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp", ".tiff"}
+MAX_UPLOAD_SIZE = 50 * 1024 * 1024  # 50MB
+
+
+async def _save_upload_file(file: UploadFile, user_id: int) -> Tuple[str, int]:
+    """
+    校验并保存单个上传文件
+    
+    Returns:
+        (storage_path, file_size)
+    
+    Raises:
+        ValidationError: 文件名为空、类型不支持或大小超限
+    """
+    if not file.filename:
+        raise ValidationError("文件名不能为空")
+    
+    file_ext = os.path.splitext(file.filename)[1].lower()
+    if file_ext not in ALLOWED_UPLOAD_EXTENSIONS:
+        raise ValidationError("不支持的文件类型")
+    
+    # 读取文件内容
+    file_content = await file.read()
+    file_size = len(file_content)
+    
+    if file_size > MAX_UPLOAD_SIZE:
+        raise ValidationError("文件大小超过50MB")
+    
+    # 生成唯一文件名，确保目录存在后保存
+    storage_path = f"uploads/{user_id}/{uuid.uuid4()}{file_ext}"
+    os.makedirs(os.path.dirname(storage_path), exist_ok=True)
+    with open(storage_path, "wb") as f:
+        f.write(file_content)
+    
+    return storage_path, file_size
+
+
 @router.post("/upload/batch", response_model=BatchUploadResponse)
 async def upload_photos_batch(
     files: List[UploadFile] = File(...),
@@ -184,42 +228,12 @@ async def upload_photos_batch(
     failed_files = []
     photo_ids = []
     
+    photo_service = PhotoService(db)
     for file in files:
         try:
-            # 验证文件
-            if not file.filename:
-                failed_files.append(f"{file.filename}: 文件名不能为空")
-                failed_count += 1
-                continue
-            
-            file_ext = os.path.splitext(file.filename)[1].lower()
-            if file_ext not in [".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp", ".tiff"]:
-                failed_files.append(f"{file.filename}: 不支持的文件类型")
-                failed_count += 1
-                continue
-            
-            # 读取文件内容
-            file_content = await file.read()
-            file_size = len(file_content)
-            
-            if file_size > 50 * 1024 * 1024:
-                failed_files.append(f"{file.filename}: 文件大小超过50MB")
-                failed_count += 1
-                continue
-            
-            # 生成唯一文件名
-            unique_filename = f"{uuid.uuid4()}{file_ext}"
-            storage_path = f"uploads/{current_user_id}/{unique_filename}"
-            
-            # 确保目录存在
-            os.makedirs(os.path.dirname(storage_path), exist_ok=True)
-            
-            # 保存文件
-            with open(storage_path, "wb") as f:
-                f.write(file_content)
+            storage_path, file_size = await _save_upload_file(file, current_user_id)
             
             # 创建照片记录
-            photo_service = PhotoService(db)
             photo = photo_service.create_photo(
                 user_id=current_user_id,
                 filename=file.filename,
@@ -242,6 +256,40 @@ async def upload_photos_batch(
     )
 
 
+@router.post("/bulk", response_model=BatchUploadResponse)
+async def upload_photos_bulk(
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """批量上传照片（单次批量写入数据库，缩略图异步生成）"""
+    failed_files = []
+    items = []
+    
+    for file in files:
+        try:
+            storage_path, file_size = await _save_upload_file(file, current_user_id)
+            items.append({
+                "filename": file.filename,
+                "storage_path": storage_path,
+                "file_size": file_size
+            })
+            
+        except Exception as e:
+            failed_files.append(f"{file.filename}: {str(e)}")
+    
+    # 一次性创建所有照片记录
+    photo_service = PhotoService(db)
+    created = photo_service.bulk_create_photos(current_user_id, items)
+    
+    return BatchUploadResponse(
+        success_count=len(created),
+        failed_count=len(failed_files),
+        failed_files=failed_files,
+        photo_ids=[photo_id for photo_id, _ in created]
+    )
+
+
 @router.get("/", response_model=PhotoListResponse)
 async def get_photos(
     page: int = Query(1, ge=1),
@@ -282,6 +330,49 @@ async def get_photo(
     return photo
 
 
+@router.get("/{photo_id}/thumbnail")
+def get_photo_thumbnail(
+    photo_id: int,
+    size: str = Query("medium", pattern="^(small|medium|large)$"),
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """
+    获取照片缩略图（优先使用已生成的文件，否则实时生成）
+    
+    同步路由，由FastAPI放到线程池执行，读文件和Pillow编码不阻塞事件循环
+    """
+    photo_service = PhotoService(db)
+    photo = photo_service.get_photo_by_id(photo_id, current_user_id)
+    
+    if not photo or not os.path.exists(photo.storage_path):
+        raise NotFoundError("照片不存在")
+    
+    # 已生成的缩略图直接返回
+    thumbnail_path = os.path.join(
+        os.path.dirname(photo.storage_path),
+        ThumbnailService.get_thumbnail_filename(photo.storage_path, size)
+    )
+    if os.path.exists(thumbnail_path):
+        return FileResponse(thumbnail_path, media_type="image/webp", headers=THUMBNAIL_CACHE_HEADERS)
+    
+    # 实时生成，直接编码到响应缓冲
+    with open(photo.storage_path, "rb") as f:
+        image_bytes = f.read()
+    
+    output = io.BytesIO()
+    if not ThumbnailService.generate_thumbnail_to_stream(
+        image_bytes,
+        ThumbnailService.SIZES[size],
+        ThumbnailService.QUALITY[size],
+        output
+    ):
+        return FileResponse(photo.storage_path)
+    
+    output.seek(0)
+    return StreamingResponse(output, media_type="image/webp", headers=THUMBNAIL_CACHE_HEADERS)
+
+
 @router.patch("/{photo_id}", response_model=PhotoResponse)
 async def update_photo(
     photo_id: int,
@@ -26,16 +26,11 @@ async def register_user(
     """用户注册"""
     user_service = UserService(db)
     
-    # 检查用户名是否已存在
-    if user_service.get_user_by_username(user_data.username):
-        raise ConflictError("用户名已存在")
-    
-    # 检查邮箱是否已存在
-    if user_service.get_user_by_email(user_data.email):
-        raise ConflictError("邮箱已存在")
-    
-    # 创建用户
-    user = user_service.create_user(user_data)
+    # 用户名/邮箱冲突由服务层一次查询检查（并发时由唯一约束兜底）
+    try:
+        user = user_service.create_user(user_data)
+    except ConflictError as e:
+        raise ValidationError(e.message)
     
     return user
 
@@ -104,19 +99,11 @@ async def update_current_user(
     """更新当前用户信息"""
     user_service = UserService(db)
     
-    # 检查用户名是否已被其他用户使用
-    if user_update.username:
-        existing_user = user_service.get_user_by_username(user_update.username)
-        if existing_user and existing_user.id != current_user_id:
-            raise ConflictError("用户名已被使用")
-    
-    # 检查邮箱是否已被其他用户使用
-    if user_update.email:
-        existing_user = user_service.get_user_by_email(user_update.email)
-        if existing_user and existing_user.id != current_user_id:
-            raise ConflictError("邮箱已被使用")
-    
-    user = user_service.update_user(current_user_id, user_update)
+    # 用户名/邮箱是否被其他用户使用由服务层检查
+    try:
+        user = user_service.update_user(current_user_id, user_update)
+    except ConflictError as e:
+        raise ValidationError(e.message)
     
     if not user:
         raise NotFoundError("用户不存在")
@@ -24,14 +24,26 @@ celery_app.conf.task_routes = {
     "app.tasks.process_photo": {"queue": "photo_processing"},
     "app.tasks.generate_tags": {"queue": "ai_processing"},
     "app.tasks.generate_embedding": {"queue": "ai_processing"},
+    "app.tasks.flush_embedding_batch": {"queue": "ai_processing"},
     "app.tasks.cleanup_old_tasks": {"queue": "maintenance"},
 }
 
+# 定时任务配置
+celery_app.conf.beat_schedule = {
+    # 向量写入队列未满一批时，按最大等待时间兜底写入
+    "flush-embedding-batch": {
+        "task": "app.tasks.flush_embedding_batch",
+        "schedule": settings.embedding_flush_interval,
+    },
+}
+
 # 任务结果配置
 celery_app.conf.result_expires = 3600  # 1小时
 celery_app.conf.result_persistent = True
 
 # 任务重试配置
+# acks_late + prefetch=1：任务执行完才确认，worker异常退出时任务重新投递；
+# worker 需以 -Ofair 启动，只向空闲子进程分发任务
 celery_app.conf.task_acks_late = True
 celery_app.conf.task_reject_on_worker_lost = True
 
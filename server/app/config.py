@@ -8,6 +8,21 @@ from pathlib import Path
 load_dotenv()  # 加载.env文件
 
 
+def with_database_driver(url: str, driver: str = "") -> str:
+    """
+    将 PostgreSQL 连接串规范为指定驱动
+    
+    DATABASE_URL 可写成 postgresql://、postgresql+psycopg2:// 或 postgresql+asyncpg://，
+    同步代码（psycopg2）与异步引擎（asyncpg）各自取所需的形式。
+    """
+    if not url or "://" not in url:
+        return url
+    scheme, rest = url.split("://", 1)
+    if scheme.split("+", 1)[0] not in ("postgresql", "postgres"):
+        return url
+    return f"postgresql+{driver}://{rest}" if driver else f"postgresql://{rest}"
+
+
 class Settings:
     """应用配置 - 支持.env文件"""
     
@@ -20,10 +35,13 @@ class Settings:
         
         # 数据库配置
         self.database_url = os.getenv("DATABASE_URL")
+        self.sync_database_url = with_database_driver(self.database_url)  # psycopg2（脚本、Celery）
+        self.async_database_url = with_database_driver(self.database_url, "asyncpg")  # API 异步引擎
         self.database_echo = os.getenv("DATABASE_ECHO", "false").lower() == "true"
         
         # Redis配置
         self.redis_url = os.getenv("REDIS_URL")
+        self.user_cache_ttl = int(os.getenv("USER_CACHE_TTL", "600"))  # 用户信息缓存秒数
         
         # 文件存储配置
         self.upload_dir = "./uploads"
@@ -32,6 +50,7 @@ class Settings:
         # AI模型配置
         self.model_cache_dir = "./models"
         self.device = os.getenv("DEVICE", "auto")
+        self.model_fp16 = os.getenv("MODEL_FP16", "false").lower() == "true"  # CUDA上以半精度加载模型
         
         # AI服务配置
         self.ai_cv_enabled = os.getenv("AI_CV_ENABLED", "true").lower() == "true"
@@ -51,6 +70,27 @@ class Settings:
         self.ai_timeout = int(os.getenv("AI_TIMEOUT", "30"))
         self.ai_retry_count = int(os.getenv("AI_RETRY_COUNT", "3"))
         
+        # 线程池配置
+        self.thread_pool_workers = int(os.getenv("THREAD_POOL_WORKERS", str((os.cpu_count() or 2) * 2)))
+        
+        # 向量写入批处理配置
+        self.embedding_batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", "128"))
+        self.embedding_flush_interval = float(os.getenv("EMBEDDING_FLUSH_INTERVAL", "2"))
+        
+        # ChromaDB连接配置
+        # persistent: 进程内嵌入式存储；http: 连接独立的Chroma服务（多worker共享）
+        self.chroma_mode = os.getenv("CHROMA_MODE", "persistent")
+        self.chroma_persist_dir = os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
+        self.chroma_host = os.getenv("CHROMA_HOST", "localhost")
+        self.chroma_port = int(os.getenv("CHROMA_PORT", "8001"))
+        
+        # ChromaDB HNSW索引参数（仅在集合创建时生效，查询路径不修改集合元数据）
+        self.chroma_hnsw_m = int(os.getenv("CHROMA_HNSW_M", "24"))
+        self.chroma_hnsw_construction_ef = int(os.getenv("CHROMA_HNSW_CONSTRUCTION_EF", "128"))
+        self.chroma_hnsw_search_ef = int(os.getenv("CHROMA_HNSW_SEARCH_EF", "100"))
+        self.chroma_hnsw_batch_size = int(os.getenv("CHROMA_HNSW_BATCH_SIZE", "500"))
+        self.chroma_hnsw_sync_threshold = int(os.getenv("CHROMA_HNSW_SYNC_THRESHOLD", "2000"))
+        
         # 任务队列配置
         self.celery_broker_url = os.getenv("CELERY_BROKER_URL")
         self.celery_result_backend = os.getenv("CELERY_RESULT_BACKEND")
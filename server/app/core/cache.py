@@ -0,0 +1,79 @@
+"""
+Redis缓存工具
+
+缓存不可用时（未配置REDIS_URL或连接失败）所有操作静默降级为未命中，
+调用方直接回源数据库。
+"""
+import json
+import logging
+from typing import Any, Optional
+
+import redis
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_redis_client = None
+
+
+def get_cache_client() -> Optional[redis.Redis]:
+    """获取缓存用Redis客户端（延迟创建）"""
+    global _redis_client
+    if _redis_client is None and settings.redis_url:
+        _redis_client = redis.from_url(
+            settings.redis_url,
+            socket_timeout=0.5,
+            socket_connect_timeout=0.5
+        )
+    return _redis_client
+
+
+def cache_get(key: str) -> Optional[Any]:
+    """读取JSON缓存，未命中或Redis异常时返回None"""
+    client = get_cache_client()
+    if client is None:
+        return None
+    try:
+        raw = client.get(key)
+    except redis.RedisError as e:
+        logger.warning(f"读取缓存失败 {key}: {e}")
+        return None
+    return json.loads(raw) if raw is not None else None
+
+
+def cache_set(key: str, value: Any, ttl: int):
+    """写入JSON缓存"""
+    client = get_cache_client()
+    if client is None:
+        return
+    try:
+        client.set(key, json.dumps(value), ex=ttl)
+    except redis.RedisError as e:
+        logger.warning(f"写入缓存失败 {key}: {e}")
+
+
+def cache_set_many(values: dict, ttl: int):
+    """批量写入JSON缓存（单次往返）"""
+    client = get_cache_client()
+    if client is None or not values:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        for key, value in values.items():
+            pipe.set(key, json.dumps(value), ex=ttl)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"批量写入缓存失败: {e}")
+
+
+def cache_delete(*keys: str):
+    """删除缓存键"""
+    client = get_cache_client()
+    keys = [key for key in keys if key]
+    if client is None or not keys:
+        return
+    try:
+        client.delete(*keys)
+    except redis.RedisError as e:
+        logger.warning(f"删除缓存失败 {keys}: {e}")
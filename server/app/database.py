@@ -1,26 +1,35 @@
 """
 数据库连接和会话管理 - 简化版本
 """
-from sqlalchemy import create_engine, MetaData
+from sqlalchemy import create_engine, MetaData, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import AsyncGenerator, Generator, Optional
 import logging
 
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
-# 创建数据库引擎
+# 创建数据库引擎（psycopg2，同步服务层与 Celery 使用）
 engine = create_engine(
-    settings.database_url,
+    settings.sync_database_url,
     echo=settings.database_echo,
     pool_pre_ping=True,
     pool_recycle=300,
 )
 
-# 创建会话工厂
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# 创建会话工厂（提交后不使对象过期，避免提交后访问属性时重新 SELECT）
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+# 异步数据库引擎（asyncpg）与会话工厂，首次使用时创建：
+# Celery worker、迁移脚本等只用同步引擎的进程导入本模块时不依赖 asyncpg
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+# 连接检查语句（模块级构造，健康检查每次请求复用）
+PING_SQL = text("SELECT 1")
 
 # 创建基础模型类
 Base = declarative_base()
@@ -42,11 +51,48 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+def get_async_engine() -> AsyncEngine:
+    """获取异步数据库引擎（延迟创建），async 路由中访问数据库不阻塞事件循环"""
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            settings.async_database_url,
+            echo=settings.database_echo,
+            pool_pre_ping=True,
+            pool_recycle=300,
+        )
+        _async_session_factory = async_sessionmaker(
+            _async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+
+async def dispose_async_engine():
+    """释放异步引擎的连接池（未创建过时什么也不做）"""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session_factory = None
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """获取异步数据库会话"""
+    get_async_engine()
+    async with _async_session_factory() as db:
+        try:
+            yield db
+        except Exception as e:
+            logger.error(f"数据库会话错误: {e}")
+            await db.rollback()
+            raise
+
+
 def test_connection() -> bool:
     """测试数据库连接"""
     try:
         with engine.connect() as conn:
-            conn.execute("SELECT 1")
+            conn.execute(PING_SQL)
         logger.info("✅ 数据库连接测试成功")
         return True
     except Exception as e:
@@ -78,8 +124,18 @@ def health_check() -> dict:
     """数据库健康检查"""
     try:
         with engine.connect() as conn:
-            from sqlalchemy import text
-            conn.execute(text("SELECT 1"))
+            conn.execute(PING_SQL)
+        return {"status": "healthy", "message": "数据库连接正常"}
+    except Exception as e:
+        logger.error(f"数据库健康检查失败: {e}")
+        return {"status": "unhealthy", "error": str(e)}
+
+
+async def async_health_check() -> dict:
+    """数据库健康检查（异步引擎）"""
+    try:
+        async with get_async_engine().connect() as conn:
+            await conn.execute(PING_SQL)
         return {"status": "healthy", "message": "数据库连接正常"}
     except Exception as e:
         logger.error(f"数据库健康检查失败: {e}")
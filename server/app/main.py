@@ -10,7 +10,7 @@ from contextlib import asynccontextmanager
 import uvicorn
 
 from app.config import settings
-from app.database import create_tables
+from app.database import create_tables, dispose_async_engine
 from app.api.v1 import photos, tags, albums, users, search
 from app.core.exceptions import MomentoException
 
@@ -27,6 +27,7 @@ async def lifespan(app: FastAPI):
     
     # 关闭时执行
     print("👋 关闭 Momento AI Photo Management System...")
+    await dispose_async_engine()
 
 
 # 创建 FastAPI 应用
@@ -102,10 +103,10 @@ async def general_exception_handler(request, exc: Exception):
 @app.get("/health")
 async def health_check():
     """健康检查"""
-    from app.database import health_check as db_health_check
+    from app.database import async_health_check
     
-    # 检查数据库连接
-    db_health = db_health_check()
+    # 检查数据库连接（异步引擎，不阻塞事件循环）
+    db_health = await async_health_check()
     
     # 简化Celery检查 - 只检查配置是否存在
     celery_status = "configured" if settings.celery_broker_url else "not_configured"
@@ -130,6 +131,22 @@ async def health_check():
     }
 
 
+# 线程池指标
+@app.get("/metrics")
+async def metrics():
+    """线程池/进程池运行指标"""
+    from app.services.thread_pool_service import thread_pool, process_pool
+    
+    return {
+        "success": True,
+        "message": "获取指标成功",
+        "data": {
+            "thread_pool": thread_pool.get_stats(),
+            "process_pool": process_pool.get_stats()
+        }
+    }
+
+
 # 根路径
 @app.get("/")
 async def root():
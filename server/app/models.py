@@ -1,9 +1,9 @@
 """
 数据库模型定义
 """
-from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Boolean, Float, JSON, ForeignKey, Index
-from sqlalchemy.dialects.postgresql import ARRAY, JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Boolean, Float, JSON, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 # from pgvector.sqlalchemy import Vector  # 使用ChromaDB替代
 from app.database import Base
@@ -29,6 +29,14 @@ class User(Base):
     # 关系
     photos = relationship("Photo", back_populates="user", cascade="all, delete-orphan")
     albums = relationship("Album", back_populates="user", cascade="all, delete-orphan")
+    
+    # INSERT/UPDATE 时用 RETURNING 取回 created_at/updated_at 等服务端生成的值，写入后无需 refresh
+    __mapper_args__ = {"eager_defaults": True}
+    
+    # 索引（用户名不区分大小写唯一，登录按 lower(username) 查找）
+    __table_args__ = (
+        Index('idx_users_username_lower', text('lower(username)'), unique=True),
+    )
 
 
 class Photo(Base):
@@ -56,6 +64,7 @@ class Photo(Base):
     location_lng = Column(Float)  # 经度
     ai_status = Column(String(20), default='pending')  # AI处理状态: pending/processing/completed/failed
     ai_error = Column(Text)  # AI处理错误信息
+    search_vector = deferred(Column(TSVECTOR))  # 全文搜索向量，由数据库触发器维护，默认不加载
     
     # 关系
     user = relationship("User", back_populates="photos")
@@ -68,6 +77,9 @@ class Photo(Base):
         Index('idx_photos_user_id_created_at', 'user_id', 'created_at'),
         Index('idx_photos_taken_at', 'taken_at'),
         Index('idx_photos_ai_status', 'ai_status'),
+        Index('idx_photos_exif_gin', 'exif_data', postgresql_using='gin'),
+        Index('idx_photos_exif_camera', text("(exif_data ->> 'camera')")),
+        Index('idx_photos_search', 'search_vector', postgresql_using='gin'),
     )
 
 
@@ -118,6 +130,7 @@ class PhotoTag(Base):
     __table_args__ = (
         Index('idx_photo_tags_confidence', 'confidence'),
         Index('idx_photo_tags_source', 'source'),
+        Index('idx_photo_tags_tag_id', 'tag_id'),
     )
 
 
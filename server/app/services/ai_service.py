@@ -24,6 +24,8 @@ class AIService:
     
     def __init__(self):
         self.device = self._get_device()
+        # 仅CUDA使用半精度；输出的嵌入向量统一转回float32
+        self.dtype = torch.float16 if settings.model_fp16 and self.device == "cuda" else torch.float32
         self.models = {}
         self._load_models()
     
@@ -46,7 +48,8 @@ class AIService:
                 "Salesforce/blip-image-captioning-base"
             )
             self.models['blip_model'] = BlipForConditionalGeneration.from_pretrained(
-                "Salesforce/blip-image-captioning-base"
+                "Salesforce/blip-image-captioning-base",
+                torch_dtype=self.dtype
             ).to(self.device)
             
             # 加载CLIP模型用于图像-文本匹配
@@ -54,10 +57,11 @@ class AIService:
                 "openai/clip-vit-base-patch32"
             )
             self.models['clip_model'] = CLIPModel.from_pretrained(
-                "openai/clip-vit-base-patch32"
+                "openai/clip-vit-base-patch32",
+                torch_dtype=self.dtype
             ).to(self.device)
             
-            logger.info("AI模型加载完成")
+            logger.info(f"AI模型加载完成 ({self.device}, {self.dtype})")
             
         except Exception as e:
             logger.error(f"AI模型加载失败: {e}")
@@ -127,6 +131,13 @@ class AIService:
             logger.error(f"图像加载失败: {e}")
             return None
     
+    def _prepare_inputs(self, inputs):
+        """将处理器输出移到计算设备，图像张量转换为模型精度"""
+        inputs = inputs.to(self.device)
+        if "pixel_values" in inputs:
+            inputs["pixel_values"] = inputs["pixel_values"].to(self.dtype)
+        return inputs
+    
     def _generate_caption(self, image: np.ndarray) -> str:
         """生成图像描述"""
         try:
@@ -134,9 +145,9 @@ class AIService:
             pil_image = Image.fromarray(image)
             
             # 使用BLIP生成描述
-            inputs = self.models['blip_processor'](pil_image, return_tensors="pt").to(self.device)
+            inputs = self._prepare_inputs(self.models['blip_processor'](pil_image, return_tensors="pt"))
             
-            with torch.no_grad():
+            with torch.inference_mode():
                 out = self.models['blip_model'].generate(**inputs, max_length=50)
             
             caption = self.models['blip_processor'].decode(out[0], skip_special_tokens=True)
@@ -184,17 +195,17 @@ class AIService:
             pil_image = Image.fromarray(image)
             
             # 使用CLIP进行图像-文本匹配
-            inputs = self.models['clip_processor'](
+            inputs = self._prepare_inputs(self.models['clip_processor'](
                 text=tag_candidates,
                 images=pil_image,
                 return_tensors="pt",
                 padding=True
-            ).to(self.device)
+            ))
             
-            with torch.no_grad():
+            with torch.inference_mode():
                 outputs = self.models['clip_model'](**inputs)
                 logits_per_image = outputs.logits_per_image
-                probs = logits_per_image.softmax(dim=1)
+                probs = logits_per_image.float().softmax(dim=1)
             
             # 提取高置信度的标签
             tags = []
@@ -212,21 +223,21 @@ class AIService:
             logger.error(f"标签生成失败: {e}")
             return []
     
-    def _generate_embedding(self, image: np.ndarray) -> Optional[List[float]]:
+    def _generate_embedding(self, image: np.ndarray) -> Optional[np.ndarray]:
         """生成图像嵌入向量"""
         try:
             # 转换图像格式
             pil_image = Image.fromarray(image)
             
             # 使用CLIP生成嵌入
-            inputs = self.models['clip_processor'](images=pil_image, return_tensors="pt").to(self.device)
+            inputs = self._prepare_inputs(self.models['clip_processor'](images=pil_image, return_tensors="pt"))
             
-            with torch.no_grad():
-                image_features = self.models['clip_model'].get_image_features(**inputs)
+            with torch.inference_mode():
+                image_features = self.models['clip_model'].get_image_features(**inputs).float()
                 # 归一化
                 image_features = image_features / image_features.norm(dim=-1, keepdim=True)
             
-            return image_features.cpu().numpy().tolist()[0]
+            return image_features.cpu().numpy()[0].astype(np.float32, copy=False)
             
         except Exception as e:
             logger.error(f"嵌入生成失败: {e}")
@@ -256,6 +267,7 @@ class AIService:
         """获取模型信息"""
         return {
             "device": self.device,
+            "dtype": str(self.dtype),
             "models_loaded": list(self.models.keys()),
             "cuda_available": torch.cuda.is_available(),
             "mps_available": torch.backends.mps.is_available()
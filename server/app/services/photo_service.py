@@ -13,8 +13,9 @@
 - 性能优化
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc, func
-from typing import List, Optional, Tuple, Dict
+from sqlalchemy import and_, desc, func, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import List, Optional, Tuple, Dict, Any
 from datetime import datetime
 import os
 import logging
@@ -23,9 +24,13 @@ from app.models import Photo, PhotoTag, Tag
 from app.schemas import PhotoCreate, PhotoUpdate, PhotoResponse, PhotoStatsResponse
 from app.core.exceptions import NotFoundError, ValidationError
 from app.services.thumbnail_service import ThumbnailService
+from app.services.thread_pool_service import process_pool
 
 logger = logging.getLogger(__name__)
 
+# 批量插入每页行数（PostgreSQL 在 1000 行左右收益趋于平稳）
+BULK_INSERT_PAGE_SIZE = 1000
+
 
 class PhotoService:
     """照片服务类"""
@@ -62,17 +67,17 @@ class PhotoService:
         Returns:
             创建的Photo对象
         """
-        # 创建照片记录
-        photo = Photo(
-            user_id=user_id,
-            filename=filename,
-            storage_path=storage_path,
-            file_size=file_size,
-            caption=caption,
-            width=width,
-            height=height,
-            exif_data=exif_data
-        )
+        # 照片记录字段
+        values = {
+            'user_id': user_id,
+            'filename': filename,
+            'storage_path': storage_path,
+            'file_size': file_size,
+            'caption': caption,
+            'width': width,
+            'height': height,
+            'exif_data': exif_data,
+        }
         
         # 生成缩略图
         if generate_thumbnails and os.path.exists(storage_path):
@@ -82,9 +87,9 @@ class PhotoService:
                 
                 # 将缩略图路径存储到数据库（可选）
                 # 这里我们可以将路径存到exif_data中
-                if photo.exif_data is None:
-                    photo.exif_data = {}
-                photo.exif_data['thumbnails'] = {
+                if values['exif_data'] is None:
+                    values['exif_data'] = {}
+                values['exif_data']['thumbnails'] = {
                     'small': os.path.basename(thumbnails.get('small', '')),
                     'medium': os.path.basename(thumbnails.get('medium', '')),
                     'large': os.path.basename(thumbnails.get('large', ''))
@@ -95,12 +100,79 @@ class PhotoService:
                 logger.error(f"❌ 缩略图生成失败: {e}")
                 # 失败不影响照片上传
         
-        self.db.add(photo)
+        # INSERT ... RETURNING 一次取回完整记录，省去 add()+refresh() 的额外查询
+        photo = self.db.scalars(insert(Photo).returning(Photo), [values]).one()
         self.db.commit()
-        self.db.refresh(photo)
         
         return photo
     
+    def bulk_create_photos(
+        self,
+        user_id: int,
+        items: List[Dict[str, Any]],
+        generate_thumbnails: bool = True
+    ) -> List[Tuple[int, str]]:
+        """
+        批量创建照片记录
+        
+        使用 INSERT ... VALUES (...), (...) RETURNING 按页一次性写入，
+        避免逐条 add()/commit() 的多次往返；缩略图在写入后提交到进程池生成。
+        
+        Args:
+            user_id: 用户ID
+            items: 照片字典列表，字段同 create_photo（filename、storage_path、file_size等）
+            generate_thumbnails: 是否生成缩略图
+            
+        Returns:
+            [(photo_id, filename), ...]，顺序与 items 一致
+        """
+        if not items:
+            return []
+        
+        rows = []
+        for item in items:
+            storage_path = item['storage_path']
+            exif_data = item.get('exif_data')
+            
+            # 缩略图文件名是确定的，先写入记录，文件由进程池异步生成
+            if generate_thumbnails:
+                exif_data = dict(exif_data or {})
+                exif_data['thumbnails'] = {
+                    size_name: ThumbnailService.get_thumbnail_filename(storage_path, size_name)
+                    for size_name in ThumbnailService.SIZES
+                }
+            
+            rows.append({
+                'user_id': user_id,
+                'filename': item['filename'],
+                'storage_path': storage_path,
+                'file_size': item.get('file_size'),
+                'caption': item.get('caption'),
+                'width': item.get('width'),
+                'height': item.get('height'),
+                'exif_data': exif_data,
+            })
+        
+        created = []
+        for start in range(0, len(rows), BULK_INSERT_PAGE_SIZE):
+            page = rows[start:start + BULK_INSERT_PAGE_SIZE]
+            stmt = pg_insert(Photo).values(page).returning(Photo.id, Photo.filename)
+            created.extend(tuple(row) for row in self.db.execute(stmt).all())
+        
+        self.db.commit()
+        logger.info(f"✅ 批量创建照片记录: {len(created)} 条")
+        
+        # 批量提交缩略图任务（由 async 接口调用，不能阻塞事件循环：
+        # 进程池已满时跳过，缩略图接口会在首次访问时实时生成）
+        if generate_thumbnails:
+            for row in rows:
+                if os.path.exists(row['storage_path']):
+                    process_pool.try_submit_task(
+                        ThumbnailService.generate_thumbnails, row['storage_path']
+                    )
+        
+        return created
+    
     def get_photo_by_id(self, photo_id: int, user_id: int) -> Optional[Photo]:
         """根据ID获取照片"""
         return self.db.query(Photo).filter(
@@ -228,25 +300,18 @@ class PhotoService:
         if len(tags) != len(tag_ids):
             raise ValidationError("部分标签不存在")
         
-        # 添加标签关联
-        for tag in tags:
-            # 检查是否已存在
-            existing = self.db.query(PhotoTag).filter(
-                and_(
-                    PhotoTag.photo_id == photo_id,
-                    PhotoTag.tag_id == tag.id,
-                    PhotoTag.source == "manual"
-                )
-            ).first()
-            
-            if not existing:
-                photo_tag = PhotoTag(
-                    photo_id=photo_id,
-                    tag_id=tag.id,
-                    source="manual",
-                    confidence=1.0
-                )
-                self.db.add(photo_tag)
+        # 添加标签关联（主键 (photo_id, tag_id, source) 冲突即已存在，无需先查询）
+        if tags:
+            stmt = pg_insert(PhotoTag).values([
+                {
+                    'photo_id': photo_id,
+                    'tag_id': tag.id,
+                    'source': "manual",
+                    'confidence': 1.0
+                }
+                for tag in tags
+            ]).on_conflict_do_nothing(index_elements=['photo_id', 'tag_id', 'source'])
+            self.db.execute(stmt)
         
         self.db.commit()
         return True
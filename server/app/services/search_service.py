@@ -2,14 +2,18 @@
 搜索服务层
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, func
+from sqlalchemy import and_, or_, desc, func, any_, cast, Text
+from sqlalchemy.dialects.postgresql import ARRAY
 from typing import List, Optional, Tuple
 from datetime import datetime
+import logging
 
 from app.models import Photo, PhotoTag, Tag
 from app.schemas import PhotoSearchRequest, PhotoResponse, SimilarPhotoRequest
 from app.core.exceptions import NotFoundError
 
+logger = logging.getLogger(__name__)
+
 
 class SearchService:
     """搜索服务类"""
@@ -46,14 +50,15 @@ class SearchService:
                 Tag.category.in_(search_request.categories)
             )
         
-        # 颜色筛选
+        # 颜色筛选（单个 ILIKE ANY 谓词，可使用 idx_photos_colors_trgm 三元组索引）
         if search_request.colors:
-            color_conditions = []
-            for color in search_request.colors:
-                color_conditions.append(
-                    func.array_to_string(Photo.dominant_colors, ',').ilike(f"%{color}%")
+            color_patterns = [
+                f"%{color.strip()}%" for color in search_request.colors if color.strip()
+            ]
+            if color_patterns:
+                query = query.filter(
+                    Photo.dominant_colors.ilike(any_(cast(color_patterns, ARRAY(Text))))
                 )
-            query = query.filter(or_(*color_conditions))
         
         # 日期筛选
         if search_request.date_from:
@@ -90,8 +95,6 @@ class SearchService:
         limit: int = 10
     ) -> List[Photo]:
         """查找相似照片"""
-        from app.services.vector_service import vector_service
-        
         # 获取目标照片
         target_photo = self.db.query(Photo).filter(
             and_(Photo.id == photo_id, Photo.user_id == user_id)
@@ -103,18 +106,24 @@ class SearchService:
         # 使用ChromaDB进行向量搜索
         try:
             # 这里需要从ChromaDB获取目标照片的向量
-            # 暂时使用标签相似度作为备选方案
-            similar_photos = self.db.query(Photo).join(PhotoTag).filter(
+            # 暂时使用标签相似度作为备选方案：与目标照片的标签做连接，按共同标签数排序
+            target_tags = self.db.query(PhotoTag.tag_id).filter(
+                PhotoTag.photo_id == photo_id
+            ).distinct().subquery()
+            
+            similar_photos = self.db.query(Photo).join(
+                PhotoTag, PhotoTag.photo_id == Photo.id
+            ).join(
+                target_tags, target_tags.c.tag_id == PhotoTag.tag_id
+            ).filter(
                 and_(
                     Photo.user_id == user_id,
-                    Photo.id != photo_id,
-                    PhotoTag.tag_id.in_(
-                        self.db.query(PhotoTag.tag_id).filter(
-                            PhotoTag.photo_id == photo_id
-                        )
-                    )
+                    Photo.id != photo_id
                 )
-            ).distinct().limit(limit).all()
+            ).group_by(Photo.id).order_by(
+                desc(func.count(PhotoTag.tag_id.distinct())),
+                desc(Photo.created_at)
+            ).limit(limit).all()
             
             return similar_photos
             
@@ -136,21 +145,22 @@ class SearchService:
     
     def get_color_suggestions(self, user_id: int) -> List[str]:
         """获取颜色建议"""
+        # 服务端游标分批读取，内存只保留去重后的颜色集合而非全部照片行
         colors = self.db.query(Photo.dominant_colors).filter(
             and_(
                 Photo.user_id == user_id,
                 Photo.dominant_colors.isnot(None)
             )
-        ).all()
+        ).yield_per(500)
         
-        # 提取所有颜色
-        all_colors = []
-        for color_array in colors:
-            if color_array[0]:
-                all_colors.extend(color_array[0])
+        # 提取所有颜色（dominant_colors 为逗号分隔的文本）并去重
+        all_colors = set()
+        for (dominant_colors,) in colors:
+            all_colors.update(
+                color.strip() for color in dominant_colors.split(',') if color.strip()
+            )
         
-        # 去重并返回
-        return list(set(all_colors))
+        return list(all_colors)
     
     def search_by_image(self, user_id: int, image_path: str, limit: int = 10) -> List[Photo]:
         """以图搜图"""
@@ -2,7 +2,8 @@
 标签服务层
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc, func, or_
+from sqlalchemy import and_, desc, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from typing import List, Optional
 from datetime import datetime
 
@@ -97,25 +98,18 @@ class TagService:
         if len(tags) != len(tag_ids):
             raise ValidationError("部分标签不存在")
         
-        # 添加标签关联
-        for tag in tags:
-            # 检查是否已存在
-            existing = self.db.query(PhotoTag).filter(
-                and_(
-                    PhotoTag.photo_id == photo_id,
-                    PhotoTag.tag_id == tag.id,
-                    PhotoTag.source == "manual"
-                )
-            ).first()
-            
-            if not existing:
-                photo_tag = PhotoTag(
-                    photo_id=photo_id,
-                    tag_id=tag.id,
-                    source="manual",
-                    confidence=1.0
-                )
-                self.db.add(photo_tag)
+        # 添加标签关联（主键 (photo_id, tag_id, source) 冲突即已存在，无需先查询）
+        if tags:
+            stmt = pg_insert(PhotoTag).values([
+                {
+                    'photo_id': photo_id,
+                    'tag_id': tag.id,
+                    'source': "manual",
+                    'confidence': 1.0
+                }
+                for tag in tags
+            ]).on_conflict_do_nothing(index_elements=['photo_id', 'tag_id', 'source'])
+            self.db.execute(stmt)
         
         self.db.commit()
         return True
@@ -147,12 +141,9 @@ class TagService:
         return False
     
     def get_popular_tags(self, limit: int = 20) -> List[Tag]:
-        """获取热门标签"""
-        return self.db.query(
-            Tag,
-            func.count(PhotoTag.tag_id).label('usage_count')
-        ).join(PhotoTag).group_by(Tag.id).order_by(
-            desc('usage_count')
+        """获取热门标签（use_count 由 photo_tags 触发器维护，走 idx_tags_use_count 索引）"""
+        return self.db.query(Tag).filter(Tag.use_count > 0).order_by(
+            desc(Tag.use_count)
         ).limit(limit).all()
     
     def search_tags(self, query: str, limit: int = 10) -> List[Tag]:
@@ -1,42 +1,123 @@
 """
 线程池服务 - 简单的异步处理方案
+
+- kind='thread': 线程池，适合IO密集型任务
+- kind='process': 进程池，适合CPU密集型任务（如缩略图生成），绕开GIL
+
+提交数受信号量限制（默认 max_workers*4），避免突发任务导致队列无限增长：
+- submit_task: 名额用尽时阻塞等待（仅用于工作线程等可阻塞的调用方）
+- try_submit_task: 名额用尽时立即返回 None，事件循环中调用不会阻塞
 """
+import os
 import threading
-from concurrent.futures import ThreadPoolExecutor
-from typing import Optional
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Optional, Dict
 import logging
 
+from app.config import settings
+
 logger = logging.getLogger(__name__)
 
 class ThreadPoolService:
     """线程池服务"""
     
-    def __init__(self, max_workers: int = 4):
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        kind: str = 'thread',
+        max_pending: Optional[int] = None
+    ):
+        if kind not in ('thread', 'process'):
+            raise ValueError(f"不支持的线程池类型: {kind}")
+        
+        if max_workers is None:
+            max_workers = (os.cpu_count() or 4) if kind == 'process' else 4
+        
         self.max_workers = max_workers
-        self.executor: Optional[ThreadPoolExecutor] = None
+        self.kind = kind
+        self.max_pending = max_pending or max_workers * 4
+        self.executor: Optional[Executor] = None
         self._lock = threading.Lock()
+        
+        # 背压控制与统计
+        self._semaphore = threading.BoundedSemaphore(self.max_pending)
+        self._stats_lock = threading.Lock()
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
     
-    def get_executor(self) -> ThreadPoolExecutor:
+    def get_executor(self) -> Executor:
         """获取线程池执行器"""
         if self.executor is None:
             with self._lock:
                 if self.executor is None:
-                    self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
-                    logger.info(f"线程池初始化完成，最大工作线程: {self.max_workers}")
+                    if self.kind == 'process':
+                        self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                        logger.info(f"进程池初始化完成，最大工作进程: {self.max_workers}")
+                    else:
+                        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+                        logger.info(f"线程池初始化完成，最大工作线程: {self.max_workers}")
         return self.executor
     
     def submit_task(self, func, *args, **kwargs):
-        """提交任务到线程池"""
-        executor = self.get_executor()
-        future = executor.submit(func, *args, **kwargs)
-        logger.info(f"任务已提交到线程池: {func.__name__}")
+        """提交任务到线程池（未完成任务达到上限时阻塞）"""
+        self._semaphore.acquire()
+        return self._submit(func, *args, **kwargs)
+    
+    def try_submit_task(self, func, *args, **kwargs):
+        """提交任务到线程池（未完成任务达到上限时不等待，返回 None）"""
+        if not self._semaphore.acquire(blocking=False):
+            with self._stats_lock:
+                self._rejected += 1
+            logger.warning(f"{'进程池' if self.kind == 'process' else '线程池'}已满，任务未提交: {func.__name__}")
+            return None
+        return self._submit(func, *args, **kwargs)
+    
+    def _submit(self, func, *args, **kwargs):
+        """在已占用一个名额的前提下提交任务"""
+        try:
+            executor = self.get_executor()
+            future = executor.submit(func, *args, **kwargs)
+        except Exception:
+            self._semaphore.release()
+            raise
+        
+        with self._stats_lock:
+            self._submitted += 1
+        future.add_done_callback(self._on_task_done)
+        logger.info(f"任务已提交到{'进程池' if self.kind == 'process' else '线程池'}: {func.__name__}")
         return future
     
+    def _on_task_done(self, future):
+        """任务完成回调：释放名额并更新统计"""
+        self._semaphore.release()
+        with self._stats_lock:
+            self._completed += 1
+            if future.cancelled() or future.exception() is not None:
+                self._failed += 1
+    
+    def get_stats(self) -> Dict[str, int]:
+        """获取线程池统计信息"""
+        with self._stats_lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "in_flight": self._submitted - self._completed,  # 排队中 + 执行中
+            }
+    
     def shutdown(self):
         """关闭线程池"""
         if self.executor:
             self.executor.shutdown(wait=True)
-            logger.info("线程池已关闭")
+            logger.info(f"{'进程池' if self.kind == 'process' else '线程池'}已关闭")
 
 # 全局线程池实例
-thread_pool = ThreadPoolService(max_workers=4)
+thread_pool = ThreadPoolService(max_workers=settings.thread_pool_workers)
+
+# 全局进程池实例（CPU密集型的缩略图生成）
+process_pool = ThreadPoolService(kind='process')
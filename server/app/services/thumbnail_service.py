@@ -13,16 +13,16 @@
 - original: 保留原图
 
 优化：
-- 使用Pillow高效处理
+- 使用Pillow高效处理（JPEG降采样解码）
 - 保持宽高比
-- WebP格式压缩
+- WebP格式压缩（按尺寸选择编码速度）
 """
 
 from PIL import Image
 import io
 import os
 from pathlib import Path
-from typing import Tuple, Dict
+from typing import Tuple, Dict, BinaryIO
 import logging
 
 logger = logging.getLogger(__name__)
@@ -47,6 +47,19 @@ class ThumbnailService:
         'large': 90,
     }
     
+    # WebP编码方法（0-6，越大越慢、压缩越好）
+    # 列表小图体积影响很小，用较快的编码；详情大图保留最佳压缩
+    METHOD = {
+        'small': 3,
+        'medium': 4,
+        'large': 6,
+    }
+    
+    @staticmethod
+    def get_thumbnail_filename(image_path: str, size_name: str) -> str:
+        """获取指定尺寸缩略图的文件名"""
+        return f"{Path(image_path).stem}_{size_name}.webp"
+    
     @staticmethod
     def generate_thumbnails(
         image_path: str,
@@ -86,6 +99,11 @@ class ThumbnailService:
             
             # 打开原图
             with Image.open(image_path) as img:
+                # JPEG按最大缩略图尺寸降采样解码（draft只会返回不小于目标的尺寸）
+                if img.format == 'JPEG':
+                    largest = max(ThumbnailService.SIZES.values(), key=lambda wh: wh[0])
+                    img.draft('RGB', largest)
+                
                 # 转换RGBA为RGB（处理PNG透明背景）
                 if img.mode in ('RGBA', 'LA', 'P'):
                     background = Image.new('RGB', img.size, (255, 255, 255))
@@ -109,7 +127,7 @@ class ThumbnailService:
                         thumb.thumbnail((width, height), Image.Resampling.LANCZOS)
                         
                         # 生成文件名
-                        output_filename = f"{file_path.stem}_{size_name}.webp"
+                        output_filename = ThumbnailService.get_thumbnail_filename(image_path, size_name)
                         output_path = os.path.join(output_dir, output_filename)
                         
                         # 保存为WebP格式（更好的压缩比）
@@ -117,7 +135,7 @@ class ThumbnailService:
                             output_path,
                             'WEBP',
                             quality=ThumbnailService.QUALITY[size_name],
-                            method=6  # 最佳压缩
+                            method=ThumbnailService.METHOD[size_name]
                         )
                         
                         result[size_name] = output_path
@@ -142,25 +160,31 @@ class ThumbnailService:
             }
     
     @staticmethod
-    def generate_thumbnail_bytes(
+    def generate_thumbnail_to_stream(
         image_bytes: bytes,
-        size: Tuple[int, int] = (600, 600),
-        quality: int = 85
-    ) -> bytes:
+        size: Tuple[int, int],
+        quality: int,
+        out_stream: BinaryIO
+    ) -> bool:
         """
-        从字节流生成缩略图字节流
+        从字节流生成缩略图，直接写入调用方提供的流（如HTTP响应缓冲）
         
         Args:
             image_bytes: 原始图片字节
             size: 目标尺寸
             quality: 图片质量 (1-100)
+            out_stream: 可写的二进制流
             
         Returns:
-            缩略图字节流
+            是否生成成功
         """
         try:
             # 从字节流打开图片
             with Image.open(io.BytesIO(image_bytes)) as img:
+                # JPEG按目标尺寸降采样解码
+                if img.format == 'JPEG':
+                    img.draft('RGB', size)
+                
                 # 转换为RGB
                 if img.mode in ('RGBA', 'LA', 'P'):
                     background = Image.new('RGB', img.size, (255, 255, 255))
@@ -174,14 +198,35 @@ class ThumbnailService:
                 # 缩放
                 img.thumbnail(size, Image.Resampling.LANCZOS)
                 
-                # 保存到字节流
-                output = io.BytesIO()
-                img.save(output, 'WEBP', quality=quality, method=6)
-                return output.getvalue()
+                # 直接编码到目标流（预览路径使用较快的编码方法）
+                img.save(out_stream, 'WEBP', quality=quality, method=4)
+                return True
                 
         except Exception as e:
-            logger.error(f"❌ 生成缩略图字节流失败: {e}")
-            return image_bytes
+            logger.error(f"❌ 生成缩略图流失败: {e}")
+            return False
+    
+    @staticmethod
+    def generate_thumbnail_bytes(
+        image_bytes: bytes,
+        size: Tuple[int, int] = (600, 600),
+        quality: int = 85
+    ) -> bytes:
+        """
+        从字节流生成缩略图字节流
+        
+        Args:
+            image_bytes: 原始图片字节
+            size: 目标尺寸
+            quality: 图片质量 (1-100)
+        
+        Returns:
+            缩略图字节流（失败时返回原图字节）
+        """
+        output = io.BytesIO()
+        if ThumbnailService.generate_thumbnail_to_stream(image_bytes, size, quality, output):
+            return output.getvalue()
+        return image_bytes
     
     @staticmethod
     def optimize_image(
@@ -1,15 +1,54 @@
 """
 用户服务层
 """
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.orm import Session, make_transient_to_detached, raiseload, selectinload
+from sqlalchemy import and_, or_, bindparam, func, select
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
 from typing import Optional
+import logging
 
+from app.config import settings
+from app.core.cache import cache_get, cache_set_many, cache_delete
 from app.models import User
 from app.schemas import UserCreate, UserUpdate, UserResponse
 from app.core.exceptions import NotFoundError, ConflictError, ValidationError
 from app.core.security import get_password_hash
 
+logger = logging.getLogger(__name__)
+
+
+# 缓存的用户字段（不含密码哈希，登录时按需从数据库加载）
+CACHED_USER_FIELDS = (
+    'id', 'username', 'email', 'is_active',
+    'default_language', 'auto_tagging', 'privacy_level'
+)
+CACHED_USER_DATETIME_FIELDS = ('created_at', 'updated_at')
+
+# 热点查询语句在模块级构建一次，复用 SQLAlchemy 编译缓存；
+# 用户名不区分大小写，走 lower(username) 表达式索引。迁移前遗留的仅大小写不同的
+# 重名用户（此时索引非唯一）优先精确匹配，否则取最早注册的
+_STMT_BY_ID = select(User).options(raiseload("*")).where(User.id == bindparam("user_id"))
+_STMT_BY_USERNAME = select(User).options(raiseload("*")).where(
+    func.lower(User.username) == bindparam("username_lower")
+).order_by(
+    (User.username == bindparam("username")).desc(),
+    User.id
+).limit(1)
+_STMT_BY_EMAIL = select(User).options(raiseload("*")).where(User.email == bindparam("email"))
+
+
+def user_cache_keys(user_id=None, username=None, email=None) -> list:
+    """用户缓存键"""
+    keys = []
+    if user_id is not None:
+        keys.append(f"user:id:{user_id}")
+    if username:
+        keys.append(f"user:name:{username.lower()}")
+    if email:
+        keys.append(f"user:email:{email}")
+    return keys
+
 
 class UserService:
     """用户服务类"""
@@ -18,25 +57,116 @@ class UserService:
         self.db = db
     
     def get_user_by_id(self, user_id: int) -> Optional[User]:
-        """根据ID获取用户"""
-        return self.db.query(User).filter(User.id == user_id).first()
+        """根据ID获取用户（Redis缓存）"""
+        return self._get_cached_user(f"user:id:{user_id}", _STMT_BY_ID, {"user_id": user_id})
     
     def get_user_by_username(self, username: str) -> Optional[User]:
-        """根据用户名获取用户"""
-        return self.db.query(User).filter(User.username == username).first()
+        """根据用户名获取用户（不区分大小写，精确大小写优先；Redis缓存键统一为小写）"""
+        return self._get_cached_user(
+            f"user:name:{username.lower()}",
+            _STMT_BY_USERNAME,
+            {"username": username, "username_lower": username.lower()}
+        )
     
     def get_user_by_email(self, email: str) -> Optional[User]:
-        """根据邮箱获取用户"""
-        return self.db.query(User).filter(User.email == email).first()
+        """根据邮箱获取用户（Redis缓存）"""
+        return self._get_cached_user(f"user:email:{email}", _STMT_BY_EMAIL, {"email": email})
+    
+    def _get_cached_user(self, key: str, stmt, params: dict) -> Optional[User]:
+        """先查缓存，未命中再查库并回填（只缓存存在的用户）"""
+        data = cache_get(key)
+        if data is not None:
+            return self._hydrate_user(data)
+        
+        user = self.db.execute(stmt, params).scalar_one_or_none()
+        if user:
+            self._cache_user(user)
+        return user
+    
+    def get_user_with_photos(self, user_id: int) -> Optional[User]:
+        """获取用户并预加载照片（一次额外的 IN 查询，不走缓存）"""
+        return self.db.query(User).options(
+            selectinload(User.photos),
+            raiseload("*")
+        ).filter(User.id == user_id).first()
+    
+    def _load_user(self, user_id: int) -> Optional[User]:
+        """绕过缓存直接从数据库加载（写操作使用，避免基于旧数据修改）"""
+        # populate_existing：会话中已有缓存 merge 进来的实例时，用数据库行覆盖其属性
+        return self.db.execute(
+            _STMT_BY_ID.execution_options(populate_existing=True),
+            {"user_id": user_id}
+        ).scalar_one_or_none()
+    
+    def _cache_user(self, user: User):
+        """以 id/用户名/邮箱 三个键写入缓存"""
+        data = {field: getattr(user, field) for field in CACHED_USER_FIELDS}
+        for field in CACHED_USER_DATETIME_FIELDS:
+            value = getattr(user, field)
+            data[field] = value.isoformat() if value else None
+        
+        keys = user_cache_keys(user.id, user.username, user.email)
+        cache_set_many({key: data for key in keys}, settings.user_cache_ttl)
+    
+    def _invalidate_user(self, user_id: int, usernames=(), emails=()):
+        """删除用户缓存（usernames/emails 传入新旧值）"""
+        keys = user_cache_keys(user_id)
+        keys += [f"user:name:{name.lower()}" for name in usernames if name]
+        keys += [f"user:email:{email}" for email in emails if email]
+        cache_delete(*keys)
+    
+    def _hydrate_user(self, data: dict) -> User:
+        """缓存数据还原为会话内的持久化对象（不发起查询，未缓存的列访问时再加载）"""
+        values = dict(data)
+        for field in CACHED_USER_DATETIME_FIELDS:
+            if values.get(field):
+                values[field] = datetime.fromisoformat(values[field])
+        
+        user = User(**values)
+        make_transient_to_detached(user)
+        return self.db.merge(user, load=False)
+    
+    def _find_conflict(
+        self,
+        username: Optional[str] = None,
+        email: Optional[str] = None,
+        exclude_user_id: Optional[int] = None
+    ) -> Optional[str]:
+        """一次查询检查用户名/邮箱冲突，返回冲突字段（'username' / 'email'）"""
+        conditions = []
+        if username:
+            conditions.append(func.lower(User.username) == username.lower())
+        if email:
+            conditions.append(User.email == email)
+        if not conditions:
+            return None
+        
+        query = self.db.query(User.id, User.username, User.email).filter(or_(*conditions))
+        if exclude_user_id is not None:
+            query = query.filter(User.id != exclude_user_id)
+        
+        existing = query.first()
+        if not existing:
+            return None
+        return 'username' if username and existing.username.lower() == username.lower() else 'email'
+    
+    def _commit_or_conflict(self, username_msg: str, email_msg: str):
+        """提交事务，并发下撞上唯一约束时回滚并转换为 ConflictError"""
+        try:
+            self.db.commit()
+        except IntegrityError as e:
+            self.db.rollback()
+            if 'email' in str(e.orig):
+                raise ConflictError(email_msg)
+            raise ConflictError(username_msg)
     
     def create_user(self, user_data: UserCreate) -> User:
         """创建用户"""
-        # 检查用户名是否已存在
-        if self.get_user_by_username(user_data.username):
+        # 检查用户名/邮箱是否已存在（单次查询）
+        conflict = self._find_conflict(user_data.username, user_data.email)
+        if conflict == 'username':
             raise ConflictError("用户名已存在")
-        
-        # 检查邮箱是否已存在
-        if self.get_user_by_email(user_data.email):
+        if conflict == 'email':
             raise ConflictError("邮箱已存在")
         
         # 创建用户
@@ -48,31 +178,32 @@ class UserService:
         )
         
         self.db.add(user)
-        self.db.commit()
-        self.db.refresh(user)
+        self._commit_or_conflict("用户名已存在", "邮箱已存在")
         
         return user
     
     def update_user(self, user_id: int, user_update: UserUpdate) -> Optional[User]:
         """更新用户信息"""
-        user = self.get_user_by_id(user_id)
+        user = self._load_user(user_id)
         
         if not user:
             return None
         
-        # 检查用户名是否已被其他用户使用
-        if user_update.username:
-            existing_user = self.get_user_by_username(user_update.username)
-            if existing_user and existing_user.id != user_id:
-                raise ConflictError("用户名已被使用")
-            user.username = user_update.username
+        old_username, old_email = user.username, user.email
         
-        # 检查邮箱是否已被其他用户使用
-        if user_update.email:
-            existing_user = self.get_user_by_email(user_update.email)
-            if existing_user and existing_user.id != user_id:
-                raise ConflictError("邮箱已被使用")
-            user.email = user_update.email
+        # 检查用户名/邮箱是否已被其他用户使用（只检查实际变更的字段，单次查询）
+        new_username = user_update.username if user_update.username and user_update.username != user.username else None
+        new_email = user_update.email if user_update.email and user_update.email != user.email else None
+        conflict = self._find_conflict(new_username, new_email, exclude_user_id=user_id)
+        if conflict == 'username':
+            raise ConflictError("用户名已被使用")
+        if conflict == 'email':
+            raise ConflictError("邮箱已被使用")
+        
+        if new_username:
+            user.username = new_username
+        if new_email:
+            user.email = new_email
         
         # 更新其他字段
         if user_update.default_language is not None:
@@ -84,43 +215,57 @@ class UserService:
         if user_update.privacy_level is not None:
             user.privacy_level = user_update.privacy_level
         
-        self.db.commit()
-        self.db.refresh(user)
+        self._commit_or_conflict("用户名已被使用", "邮箱已被使用")
+        self._invalidate_user(user_id, (old_username, new_username), (old_email, new_email))
         
         return user
     
     def delete_user(self, user_id: int) -> bool:
         """删除用户"""
-        user = self.get_user_by_id(user_id)
+        # 级联删除需要加载照片、相册，这里不能使用 raiseload
+        user = self.db.query(User).filter(User.id == user_id).first()
         
         if not user:
             return False
         
+        username, email = user.username, user.email
         self.db.delete(user)
         self.db.commit()
+        self._invalidate_user(user_id, (username,), (email,))
+        
+        # 删除该用户的向量集合（尽力而为：用户已删除，Chroma不可用时只记录警告）
+        try:
+            from app.services.vector_service import get_vector_service
+            get_vector_service().delete_user_collection(user_id)
+        except Exception as e:
+            logger.warning(f"⚠️ 用户 {user_id} 向量集合清理失败: {e}")
         
         return True
     
     def activate_user(self, user_id: int) -> bool:
         """激活用户"""
-        user = self.get_user_by_id(user_id)
+        user = self._load_user(user_id)
         
         if not user:
             return False
         
         user.is_active = True
+        username, email = user.username, user.email
         self.db.commit()
+        self._invalidate_user(user_id, (username,), (email,))
         
         return True
     
     def deactivate_user(self, user_id: int) -> bool:
         """停用用户"""
-        user = self.get_user_by_id(user_id)
+        user = self._load_user(user_id)
         
         if not user:
             return False
         
         user.is_active = False
+        username, email = user.username, user.email
         self.db.commit()
+        self._invalidate_user(user_id, (username,), (email,))
         
         return True
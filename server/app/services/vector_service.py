@@ -1,130 +1,537 @@
 """
 向量搜索服务 - 使用ChromaDB
+
+写入优化：
+- add_photo_embeddings_batch 每批一次 collection.add，摊薄单次事务开销
+- 向量统一使用 float32 的 np.ndarray，批量写入时预分配二维数组，
+  仅在调用ChromaDB时整体转换一次（chromadb 0.4.x 只接受 list）；
+  float16 等其他精度的输入在此统一转换（HNSW索引只存储float32）
+- 写入时在 metadata 中记录向量摘要（embedding_hash），更新前批量 get 比对，
+  向量未变化时跳过 HNSW 更新
+
+集合划分：每个用户一个集合（photo_embeddings_{user_id}），搜索只遍历该用户自己的
+HNSW索引，不再依赖 where 过滤；集合句柄以LRU方式缓存。旧版共享集合 photo_embeddings
+中的数据由 run_migration.py 调用 migrate_shared_collection() 迁移。
+
+连接模式（settings.chroma_mode）：
+- persistent: 进程内 PersistentClient
+- http: 连接独立的Chroma服务；AsyncVectorService 在线程中并发执行写入，
+  让单个worker可以同时进行多个写入往返
 """
+import asyncio
+import hashlib
 import chromadb
 from chromadb.config import Settings as ChromaSettings
-from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
+import os
+import threading
 import logging
 
+from app.config import settings
+
 logger = logging.getLogger(__name__)
 
+EMBEDDING_HASH_KEY = "embedding_hash"
+
+# 用户集合名前缀；旧版所有用户共用的集合也叫这个名字
+COLLECTION_PREFIX = "photo_embeddings"
+
+
+def is_missing_collection_error(error: Exception) -> bool:
+    """
+    判断是否为"集合不存在"错误
+    
+    PersistentClient 抛出 ValueError；HttpClient 把服务端异常转成通用异常，
+    只能通过消息文本识别
+    """
+    return isinstance(error, ValueError) or "does not exist" in str(error)
+
+
+def embedding_digest(embedding: np.ndarray) -> str:
+    """向量摘要（float32原始字节的64位blake2b）"""
+    data = np.ascontiguousarray(embedding, dtype=np.float32).tobytes()
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
 
 class VectorService:
     """向量搜索服务"""
     
-    def __init__(self, persist_directory: str = "./chroma_db"):
+    # 批量查询超过该数量时拆分为子批次并行执行
+    QUERY_BATCH_PARALLEL_THRESHOLD = 64
+    QUERY_CHUNK_SIZE = 32
+    
+    # 缓存的用户集合句柄数量
+    USER_COLLECTION_CACHE_SIZE = 512
+    
+    def __init__(
+        self,
+        persist_directory: Optional[str] = None,
+        ef_search: Optional[int] = None,
+        mode: Optional[str] = None
+    ):
         """初始化ChromaDB客户端"""
-        self.client = chromadb.PersistentClient(
-            path=persist_directory,
-            settings=ChromaSettings(
-                anonymized_telemetry=False,
-                allow_reset=True
-            )
+        chroma_settings = ChromaSettings(
+            anonymized_telemetry=False,
+            allow_reset=True
         )
+        if (mode or settings.chroma_mode) == "http":
+            self.client = chromadb.HttpClient(
+                host=settings.chroma_host,
+                port=settings.chroma_port,
+                settings=chroma_settings
+            )
+        else:
+            self.client = chromadb.PersistentClient(
+                path=persist_directory or settings.chroma_persist_dir,
+                settings=chroma_settings
+            )
         
-        # 创建或获取集合
-        self.collection = self.client.get_or_create_collection(
-            name="photo_embeddings",
-            metadata={"hnsw:space": "cosine"}
-        )
+        # 新建用户集合时使用的HNSW参数（见 settings.chroma_hnsw_*）
+        self.ef_search = ef_search or settings.chroma_hnsw_search_ef
+        self.collection_metadata = {
+            "hnsw:space": "cosine",
+            "hnsw:M": settings.chroma_hnsw_m,
+            "hnsw:construction_ef": settings.chroma_hnsw_construction_ef,
+            "hnsw:search_ef": self.ef_search,
+            "hnsw:batch_size": settings.chroma_hnsw_batch_size,
+            "hnsw:sync_threshold": settings.chroma_hnsw_sync_threshold,
+        }
+        
+        # 用户集合句柄 LRU 缓存 {user_id: Collection}
+        self._user_collections: "OrderedDict[int, Any]" = OrderedDict()
+        self._collections_lock = threading.Lock()
+        
+        # 批量写入的子批次大小
+        self.batch_size = settings.embedding_batch_size
         
         logger.info("✅ ChromaDB向量服务初始化完成")
     
+    @staticmethod
+    def _collection_name(user_id: int) -> str:
+        """用户集合名"""
+        return f"{COLLECTION_PREFIX}_{user_id}"
+    
+    def _get_user_collection(self, user_id: int, create: bool = True):
+        """
+        获取用户的向量集合
+        
+        Args:
+            user_id: 用户ID
+            create: 集合不存在时是否创建；为 False 且集合不存在时返回 None
+        """
+        with self._collections_lock:
+            collection = self._user_collections.get(user_id)
+            if collection is not None:
+                self._user_collections.move_to_end(user_id)
+                return collection
+        
+        name = self._collection_name(user_id)
+        if create:
+            collection = self.client.get_or_create_collection(
+                name=name,
+                metadata=dict(self.collection_metadata)
+            )
+        else:
+            try:
+                collection = self.client.get_collection(name=name)
+            except Exception as e:
+                if is_missing_collection_error(e):
+                    return None
+                raise
+        
+        with self._collections_lock:
+            self._user_collections[user_id] = collection
+            self._user_collections.move_to_end(user_id)
+            while len(self._user_collections) > self.USER_COLLECTION_CACHE_SIZE:
+                self._user_collections.popitem(last=False)
+        return collection
+    
+    @staticmethod
+    def _group_by_user(
+        items: List[Tuple[int, np.ndarray, Dict[str, Any]]]
+    ) -> Dict[int, List[Tuple[int, np.ndarray, Dict[str, Any]]]]:
+        """按 metadata 中的 user_id 分组"""
+        groups: Dict[int, List[Tuple[int, np.ndarray, Dict[str, Any]]]] = {}
+        for item in items:
+            groups.setdefault(int(item[2].get("user_id") or 0), []).append(item)
+        return groups
+    
     def add_photo_embedding(
         self, 
         photo_id: int, 
-        embedding: List[float], 
+        embedding: np.ndarray, 
         metadata: Dict[str, Any]
     ) -> bool:
         """添加照片向量"""
-        try:
-            self.collection.add(
-                ids=[str(photo_id)],
-                embeddings=[embedding],
-                metadatas=[metadata]
-            )
+        if self.add_photo_embeddings_batch([(photo_id, embedding, metadata)]):
             logger.info(f"✅ 照片 {photo_id} 向量已添加")
             return True
+        return False
+    
+    def add_photo_embeddings_batch(
+        self,
+        items: List[Tuple[int, np.ndarray, Dict[str, Any]]]
+    ) -> bool:
+        """
+        批量添加照片向量
+        
+        Args:
+            items: [(photo_id, embedding, metadata), ...]，按用户集合分组，
+                   每组按 batch_size 分批写入
+        """
+        try:
+            for user_id, user_items in self._group_by_user(items).items():
+                collection = self._get_user_collection(user_id)
+                for start in range(0, len(user_items), self.batch_size):
+                    batch = user_items[start:start + self.batch_size]
+                    
+                    # 预分配 (n, dim) float32 数组，逐行填充
+                    dim = np.asarray(batch[0][1]).shape[-1]
+                    embeddings = np.empty((len(batch), dim), dtype=np.float32)
+                    for row, (_, embedding, _) in enumerate(batch):
+                        embeddings[row] = embedding
+                    
+                    collection.add(
+                        ids=[str(photo_id) for photo_id, _, _ in batch],
+                        embeddings=embeddings.tolist(),
+                        metadatas=[
+                            {**metadata, EMBEDDING_HASH_KEY: embedding_digest(embeddings[row])}
+                            for row, (_, _, metadata) in enumerate(batch)
+                        ]
+                    )
+            if len(items) > 1:
+                logger.info(f"✅ 批量添加向量: {len(items)} 条")
+            return True
         except Exception as e:
-            logger.error(f"❌ 添加向量失败: {e}")
+            logger.error(f"❌ 批量添加向量失败: {e}")
             return False
     
     def search_similar_photos(
         self, 
-        query_embedding: List[float], 
+        query_embedding: np.ndarray, 
         limit: int = 10,
         user_id: Optional[int] = None
     ) -> List[Dict[str, Any]]:
-        """搜索相似照片"""
+        """搜索用户的相似照片（HNSW ef 在集合创建时由 settings.chroma_hnsw_search_ef 固定）"""
         try:
-            # 构建查询条件
-            where = {}
-            if user_id:
-                where["user_id"] = user_id
+            if not user_id:
+                logger.warning("⚠️ 向量搜索未指定用户，返回空结果")
+                return []
             
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=limit,
-                where=where if where else None
+            collection = self._get_user_collection(user_id, create=False)
+            if collection is None:
+                return []
+            
+            results = collection.query(
+                query_embeddings=np.asarray(query_embedding, dtype=np.float32).reshape(1, -1).tolist(),
+                n_results=limit
             )
             
-            similar_photos = []
-            if results['ids'] and results['ids'][0]:
-                for i, photo_id in enumerate(results['ids'][0]):
-                    similar_photos.append({
-                        'photo_id': int(photo_id),
-                        'distance': results['distances'][0][i],
-                        'metadata': results['metadatas'][0][i]
-                    })
+            if not results['ids']:
+                return []
             
-            return similar_photos
+            return self._format_results(
+                results['ids'][0], results['distances'][0], results['metadatas'][0]
+            )
             
         except Exception as e:
             logger.error(f"❌ 向量搜索失败: {e}")
             return []
     
+    def search_similar_photos_batch(
+        self,
+        query_embeddings: np.ndarray,
+        limit: int = 10,
+        user_id: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        批量搜索相似照片
+        
+        Args:
+            query_embeddings: (B, D) 查询向量矩阵
+            limit: 每个查询返回的结果数
+            user_id: 在该用户的集合中搜索
+            
+        Returns:
+            与查询顺序一致的 B 个结果列表
+        """
+        try:
+            query_embeddings = np.asarray(query_embeddings, dtype=np.float32)
+            if query_embeddings.ndim == 1:
+                query_embeddings = query_embeddings.reshape(1, -1)
+            
+            collection = self._get_user_collection(user_id, create=False) if user_id else None
+            if collection is None:
+                return [[] for _ in range(len(query_embeddings))]
+            
+            def query_chunk(chunk: np.ndarray) -> List[List[Dict[str, Any]]]:
+                results = collection.query(
+                    query_embeddings=chunk.tolist(),
+                    n_results=limit
+                )
+                return [
+                    self._format_results(ids, distances, metadatas)
+                    for ids, distances, metadatas in zip(
+                        results['ids'], results['distances'], results['metadatas']
+                    )
+                ]
+            
+            # 小批量一次查询；大批量拆分为子批次并行查询
+            if len(query_embeddings) <= self.QUERY_BATCH_PARALLEL_THRESHOLD:
+                return query_chunk(query_embeddings)
+            
+            chunks = [
+                query_embeddings[start:start + self.QUERY_CHUNK_SIZE]
+                for start in range(0, len(query_embeddings), self.QUERY_CHUNK_SIZE)
+            ]
+            with ThreadPoolExecutor(max_workers=min(len(chunks), os.cpu_count() or 4)) as executor:
+                chunk_results = list(executor.map(query_chunk, chunks))
+            
+            return [photos for chunk in chunk_results for photos in chunk]
+            
+        except Exception as e:
+            logger.error(f"❌ 批量向量搜索失败: {e}")
+            return [[] for _ in range(len(query_embeddings))]
+    
+    @staticmethod
+    def _format_results(
+        ids: List[str],
+        distances: List[float],
+        metadatas: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """将单个查询的结果整理为字典列表（id 用一次 map 批量转换）"""
+        return [
+            {
+                'photo_id': photo_id,
+                'distance': distance,
+                'metadata': metadata
+            }
+            for photo_id, distance, metadata in zip(map(int, ids), distances, metadatas)
+        ]
+    
     def update_photo_embedding(
         self, 
         photo_id: int, 
-        embedding: List[float], 
+        embedding: np.ndarray, 
         metadata: Dict[str, Any]
     ) -> bool:
         """更新照片向量"""
-        try:
-            self.collection.update(
-                ids=[str(photo_id)],
-                embeddings=[embedding],
-                metadatas=[metadata]
-            )
+        if self.update_photo_embeddings_batch([(photo_id, embedding, metadata)]):
             logger.info(f"✅ 照片 {photo_id} 向量已更新")
             return True
+        return False
+    
+    def update_photo_embeddings_batch(
+        self,
+        items: List[Tuple[int, np.ndarray, Dict[str, Any]]]
+    ) -> bool:
+        """
+        批量更新照片向量
+        
+        先用一次 collection.get 取回现有 metadata，比对向量摘要：
+        向量与 metadata 都未变化的跳过；只有 metadata 变化的只更新 metadata，不触发HNSW重建。
+        """
+        try:
+            for user_id, user_items in self._group_by_user(items).items():
+                collection = self._get_user_collection(user_id)
+                for start in range(0, len(user_items), self.batch_size):
+                    batch = user_items[start:start + self.batch_size]
+                    ids = [str(photo_id) for photo_id, _, _ in batch]
+                    
+                    existing = collection.get(ids=ids, include=["metadatas"])
+                    stored = dict(zip(existing["ids"], existing["metadatas"]))
+                    
+                    vector_ids, vector_rows, vector_metadatas = [], [], []
+                    meta_ids, meta_metadatas = [], []
+                    for doc_id, (_, embedding, metadata) in zip(ids, batch):
+                        embedding = np.asarray(embedding, dtype=np.float32).reshape(-1)
+                        new_metadata = {**metadata, EMBEDDING_HASH_KEY: embedding_digest(embedding)}
+                        old_metadata = stored.get(doc_id) or {}
+                        
+                        if old_metadata.get(EMBEDDING_HASH_KEY) != new_metadata[EMBEDDING_HASH_KEY]:
+                            vector_ids.append(doc_id)
+                            vector_rows.append(embedding)
+                            vector_metadatas.append(new_metadata)
+                        elif old_metadata != new_metadata:
+                            meta_ids.append(doc_id)
+                            meta_metadatas.append(new_metadata)
+                    
+                    if vector_ids:
+                        collection.update(
+                            ids=vector_ids,
+                            embeddings=np.stack(vector_rows).tolist(),
+                            metadatas=vector_metadatas
+                        )
+                    if meta_ids:
+                        collection.update(ids=meta_ids, metadatas=meta_metadatas)
+                    
+                    skipped = len(batch) - len(vector_ids) - len(meta_ids)
+                    if skipped:
+                        logger.info(f"⏭️ 向量未变化，跳过更新: {skipped} 条")
+            return True
         except Exception as e:
             logger.error(f"❌ 更新向量失败: {e}")
             return False
     
-    def delete_photo_embedding(self, photo_id: int) -> bool:
+    def delete_photo_embedding(self, photo_id: int, user_id: int) -> bool:
         """删除照片向量"""
         try:
-            self.collection.delete(ids=[str(photo_id)])
+            collection = self._get_user_collection(user_id, create=False)
+            if collection is not None:
+                collection.delete(ids=[str(photo_id)])
             logger.info(f"✅ 照片 {photo_id} 向量已删除")
             return True
         except Exception as e:
             logger.error(f"❌ 删除向量失败: {e}")
             return False
     
+    def delete_user_collection(self, user_id: int) -> bool:
+        """删除用户的整个向量集合（注销用户时调用）"""
+        with self._collections_lock:
+            self._user_collections.pop(user_id, None)
+        try:
+            self.client.delete_collection(name=self._collection_name(user_id))
+            logger.info(f"✅ 用户 {user_id} 向量集合已删除")
+            return True
+        except Exception as e:
+            if is_missing_collection_error(e):
+                # 用户没有任何向量
+                return True
+            logger.error(f"❌ 删除用户向量集合失败: {e}")
+            return False
+    
+    def migrate_shared_collection(self, page_size: int = 1000) -> int:
+        """把旧版共享集合中的向量按用户迁移到各自集合，完成后删除共享集合，返回迁移条数"""
+        try:
+            shared = self.client.get_collection(name=COLLECTION_PREFIX)
+        except Exception as e:
+            if is_missing_collection_error(e):
+                return 0
+            raise
+        
+        moved = 0
+        while True:
+            page = shared.get(limit=page_size, include=["embeddings", "metadatas"])
+            if not page["ids"]:
+                break
+            
+            items = [
+                (int(doc_id), np.asarray(embedding, dtype=np.float32), metadata or {})
+                for doc_id, embedding, metadata in zip(page["ids"], page["embeddings"], page["metadatas"])
+            ]
+            if not self.add_photo_embeddings_batch(items):
+                raise RuntimeError("迁移共享向量集合失败")
+            shared.delete(ids=page["ids"])
+            moved += len(items)
+        
+        self.client.delete_collection(name=COLLECTION_PREFIX)
+        logger.info(f"✅ 共享向量集合已迁移: {moved} 条")
+        return moved
+    
     def get_collection_stats(self) -> Dict[str, Any]:
-        """获取集合统计信息"""
+        """获取集合统计信息（汇总所有用户集合）"""
         try:
-            count = self.collection.count()
+            prefix = f"{COLLECTION_PREFIX}_"
+            collections = [c for c in self.client.list_collections() if c.name.startswith(prefix)]
             return {
-                "total_embeddings": count,
-                "collection_name": self.collection.name
+                "total_embeddings": sum(c.count() for c in collections),
+                "user_collections": len(collections),
+                "collection_prefix": prefix
             }
         except Exception as e:
             logger.error(f"❌ 获取统计信息失败: {e}")
             return {"error": str(e)}
 
 
-# 全局向量服务实例
-vector_service = VectorService()
+class AsyncVectorService:
+    """
+    异步向量服务
+    
+    chromadb 0.4.x 没有异步客户端，这里把同步调用放到线程中执行；
+    HTTP模式下线程在等待网络IO时不占用GIL，多个写入往返可以重叠。
+    """
+    
+    def __init__(self, service: VectorService):
+        self.service = service
+    
+    async def add_photo_embedding(
+        self,
+        photo_id: int,
+        embedding: np.ndarray,
+        metadata: Dict[str, Any]
+    ) -> bool:
+        """添加照片向量"""
+        return await asyncio.to_thread(
+            self.service.add_photo_embedding, photo_id, embedding, metadata
+        )
+    
+    async def add_photo_embeddings_batch(
+        self,
+        items: List[Tuple[int, np.ndarray, Dict[str, Any]]]
+    ) -> bool:
+        """批量添加照片向量，各子批次并发写入"""
+        batch_size = self.service.batch_size
+        results = await asyncio.gather(*(
+            asyncio.to_thread(
+                self.service.add_photo_embeddings_batch, items[start:start + batch_size]
+            )
+            for start in range(0, len(items), batch_size)
+        ))
+        return all(results)
+    
+    async def search_similar_photos(
+        self,
+        query_embedding: np.ndarray,
+        limit: int = 10,
+        user_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """搜索相似照片"""
+        return await asyncio.to_thread(
+            self.service.search_similar_photos, query_embedding, limit, user_id
+        )
+    
+    async def delete_photo_embedding(self, photo_id: int, user_id: int) -> bool:
+        """删除照片向量"""
+        return await asyncio.to_thread(self.service.delete_photo_embedding, photo_id, user_id)
+
+
+# 全局向量服务实例（延迟创建，导入模块时不打开ChromaDB）
+_vector_service: Optional[VectorService] = None
+_async_vector_service: Optional[AsyncVectorService] = None
+_service_lock = threading.Lock()
+
+
+def get_vector_service() -> VectorService:
+    """获取全局向量服务"""
+    global _vector_service
+    if _vector_service is None:
+        with _service_lock:
+            if _vector_service is None:
+                _vector_service = VectorService()
+    return _vector_service
+
+
+def reset_vector_service() -> None:
+    """丢弃当前进程的向量服务实例（fork出的子进程不能复用父进程的客户端连接）"""
+    global _vector_service, _async_vector_service
+    with _service_lock:
+        _vector_service = None
+        _async_vector_service = None
+
+
+def get_async_vector_service() -> AsyncVectorService:
+    """获取全局异步向量服务"""
+    global _async_vector_service
+    if _async_vector_service is None:
+        _async_vector_service = AsyncVectorService(get_vector_service())
+    return _async_vector_service
+
+
+def __getattr__(name: str):
+    """兼容旧的 `from app.services.vector_service import vector_service` 写法"""
+    if name == "vector_service":
+        return get_vector_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
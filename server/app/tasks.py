@@ -2,80 +2,150 @@
 Celery 任务定义
 """
 from celery import current_task
-from sqlalchemy.orm import sessionmaker
+from celery.signals import task_postrun, worker_process_init
+from sqlalchemy.orm import scoped_session, sessionmaker
+from app.config import settings
 from app.database import engine
+from app.models import Photo
 from app.services.ai_service import AIService
-from app.services.photo_service import PhotoService
 from app.services.tag_service import TagService
 from app.celery_app import celery_app
+import asyncio
+import base64
+import json
 import logging
+import numpy as np
+import redis
 
 logger = logging.getLogger(__name__)
 
-# 创建数据库会话
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# 任务级数据库会话：同一任务内多次获取得到同一会话，只占用一个连接，
+# task_postrun 时释放。各任务路由到不同队列、在不同worker进程中执行，
+# 会话无法跨任务共享，因此以"每个任务一个会话"为粒度
+db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
 
+# 待写入ChromaDB的向量队列（Redis列表，LPUSH写入，从尾部批量取出）
+EMBEDDING_PENDING_KEY = "emb:pending"
 
-@celery_app.task(bind=True)
+# 照片处理进度（Redis哈希 pct/stage，供前端轮询，不经过Celery结果后端）
+PHOTO_PROGRESS_KEY = "photo:progress:{photo_id}"
+PHOTO_PROGRESS_TTL = 60
+
+_redis_client = None
+
+# 每个worker进程共享一个AIService（模型只加载一次）
+_ai_service = None
+
+
+def get_redis():
+    """获取Redis客户端（延迟创建）"""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.from_url(settings.redis_url)
+    return _redis_client
+
+
+def get_ai_service() -> AIService:
+    """获取进程内共享的AIService（未经过worker_process_init时延迟创建）"""
+    global _ai_service
+    if _ai_service is None:
+        _ai_service = AIService()
+    return _ai_service
+
+
+@worker_process_init.connect
+def reset_vector_client(**kwargs):
+    """worker子进程中重新创建Chroma客户端，不复用fork前父进程的连接"""
+    from app.services.vector_service import reset_vector_service
+    reset_vector_service()
+
+
+@worker_process_init.connect
+def init_ai_service(**kwargs):
+    """worker子进程启动时预加载AI模型，避免首个任务承担加载耗时"""
+    try:
+        get_ai_service()
+    except Exception as e:
+        # 预加载失败不阻止worker启动，首个任务会再次尝试加载
+        logger.error(f"AI模型预加载失败: {e}")
+
+
+@task_postrun.connect
+def remove_db_session(**kwargs):
+    """任务结束后关闭会话，连接归还连接池"""
+    db_session.remove()
+
+
+def set_photo_progress(photo_id: int, pct: int, stage: str):
+    """记录照片处理进度（一次往返写入并续期）"""
+    try:
+        key = PHOTO_PROGRESS_KEY.format(photo_id=photo_id)
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.hset(key, mapping={"pct": pct, "stage": stage})
+        pipe.expire(key, PHOTO_PROGRESS_TTL)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"记录处理进度失败: {e}")
+
+
+def encode_embedding(embedding: np.ndarray) -> str:
+    """float32向量编码为base64字符串（原始字节，避免逐元素JSON序列化）"""
+    return base64.b64encode(np.asarray(embedding, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def decode_embedding(data: str) -> np.ndarray:
+    """base64字符串解码为float32向量"""
+    return np.frombuffer(base64.b64decode(data), dtype=np.float32)
+
+
+@celery_app.task(
+    bind=True,
+    acks_late=True,
+    autoretry_for=(Exception,),
+    max_retries=3,
+    retry_backoff=True,
+    retry_jitter=True
+)
 def process_photo(self, photo_id: int, image_path: str):
     """处理照片的异步任务"""
     try:
         logger.info(f"开始处理照片 {photo_id}")
         
-        # 更新任务状态
-        self.update_state(
-            state="PROGRESS",
-            meta={"current": 0, "total": 100, "status": "开始处理"}
-        )
+        # 任务状态 STARTED/SUCCESS 由Celery自动记录（task_track_started），
+        # 中间进度写入独立的Redis哈希
+        set_photo_progress(photo_id, 10, "processing")
         
-        # 创建数据库会话
-        db = SessionLocal()
+        # 获取AI服务（进程内共享）
+        ai_service = get_ai_service()
         
-        try:
-            # 初始化AI服务
-            ai_service = AIService()
-            
-            # 更新状态
-            self.update_state(
-                state="PROGRESS",
-                meta={"current": 20, "total": 100, "status": "AI模型加载中"}
-            )
-            
-            # 处理图像
-            result = ai_service._process_photo_sync(photo_id, image_path)
-            
-            # 更新状态
-            self.update_state(
-                state="PROGRESS",
-                meta={"current": 80, "total": 100, "status": "保存结果"}
-            )
-            
-            # 这里应该保存结果到数据库
-            # 暂时跳过
-            
-            # 完成
+        # 处理图像
+        result = ai_service._process_photo_sync(photo_id, image_path)
+        
+        # 这里应该保存结果到数据库
+        # 暂时跳过
+        
+        set_photo_progress(photo_id, 100, "completed")
+        
+        logger.info(f"照片 {photo_id} 处理完成")
+        
+        return {
+            "photo_id": photo_id,
+            "status": "success",
+            "result": result
+        }
+    
+    except Exception as e:
+        # autoretry_for 会在抛出后自动重试，仅最后一次失败时才标记为失败
+        if self.request.retries >= self.max_retries:
+            logger.error(f"照片处理失败: {e}")
+            set_photo_progress(photo_id, 100, "failed")
             self.update_state(
-                state="SUCCESS",
-                meta={"current": 100, "total": 100, "status": "处理完成"}
+                state="FAILURE",
+                meta={"error": str(e)}
             )
-            
-            logger.info(f"照片 {photo_id} 处理完成")
-            
-            return {
-                "photo_id": photo_id,
-                "status": "success",
-                "result": result
-            }
-            
-        finally:
-            db.close()
-            
-    except Exception as e:
-        logger.error(f"照片处理失败: {e}")
-        self.update_state(
-            state="FAILURE",
-            meta={"error": str(e)}
-        )
+        else:
+            logger.warning(f"照片处理失败，准备第 {self.request.retries + 1} 次重试: {e}")
+            set_photo_progress(photo_id, 10, "retrying")
         raise
 
 
@@ -85,44 +155,40 @@ def generate_tags(photo_id: int, image_path: str):
     try:
         logger.info(f"开始为照片 {photo_id} 生成标签")
         
-        # 创建数据库会话
-        db = SessionLocal()
+        # 获取任务级数据库会话（task_postrun 时统一释放）
+        db = db_session()
         
-        try:
-            # 初始化服务
-            ai_service = AIService()
-            tag_service = TagService(db)
-            
-            # 加载图像
-            image = ai_service._load_image(image_path)
-            if image is None:
-                raise Exception("图像加载失败")
-            
-            # 生成标签
-            tags = ai_service._generate_tags(image)
-            
-            # 保存标签到数据库
-            for tag_data in tags:
-                # 获取或创建标签
-                tag = tag_service.get_or_create_tag(
-                    name=tag_data["name"],
-                    category="object"
-                )
-                
-                # 创建照片标签关联
-                # 这里需要实现PhotoTag的创建逻辑
-            
-            logger.info(f"照片 {photo_id} 标签生成完成")
-            
-            return {
-                "photo_id": photo_id,
-                "tags": tags,
-                "status": "success"
-            }
-            
-        finally:
-            db.close()
+        # 初始化服务
+        ai_service = get_ai_service()
+        tag_service = TagService(db)
+        
+        # 加载图像
+        image = ai_service._load_image(image_path)
+        if image is None:
+            raise Exception("图像加载失败")
+        
+        # 生成标签
+        tags = ai_service._generate_tags(image)
+        
+        # 保存标签到数据库
+        for tag_data in tags:
+            # 获取或创建标签
+            tag = tag_service.get_or_create_tag(
+                name=tag_data["name"],
+                category="object"
+            )
             
+            # 创建照片标签关联
+            # 这里需要实现PhotoTag的创建逻辑
+        
+        logger.info(f"照片 {photo_id} 标签生成完成")
+        
+        return {
+            "photo_id": photo_id,
+            "tags": tags,
+            "status": "success"
+        }
+    
     except Exception as e:
         logger.error(f"标签生成失败: {e}")
         raise
@@ -134,42 +200,95 @@ def generate_embedding(photo_id: int, image_path: str):
     try:
         logger.info(f"开始为照片 {photo_id} 生成嵌入向量")
         
-        # 创建数据库会话
-        db = SessionLocal()
+        # 获取任务级数据库会话（task_postrun 时统一释放）
+        db = db_session()
         
-        try:
-            # 初始化AI服务
-            ai_service = AIService()
-            
-            # 加载图像
-            image = ai_service._load_image(image_path)
-            if image is None:
-                raise Exception("图像加载失败")
-            
-            # 生成嵌入向量
-            embedding = ai_service._generate_embedding(image)
-            
-            if embedding:
-                # 更新照片的嵌入向量
-                photo_service = PhotoService(db)
-                # 这里需要实现嵌入向量的保存逻辑
-            
-            logger.info(f"照片 {photo_id} 嵌入向量生成完成")
-            
-            return {
-                "photo_id": photo_id,
-                "embedding_length": len(embedding) if embedding else 0,
-                "status": "success"
+        # 获取AI服务（进程内共享）
+        ai_service = get_ai_service()
+        
+        # 加载图像
+        image = ai_service._load_image(image_path)
+        if image is None:
+            raise Exception("图像加载失败")
+        
+        # 生成嵌入向量
+        embedding = ai_service._generate_embedding(image)
+        
+        if embedding is not None:
+            # 放入待写入队列，由 flush_embedding_batch 批量写入ChromaDB
+            photo = db.query(Photo).filter(Photo.id == photo_id).first()
+            metadata = {
+                "user_id": photo.user_id if photo else 0,
+                "filename": photo.filename if photo else ""
             }
+            r = get_redis()
+            pending = r.lpush(EMBEDDING_PENDING_KEY, json.dumps({
+                "photo_id": photo_id,
+                "embedding": encode_embedding(embedding),
+                "metadata": metadata
+            }))
             
-        finally:
-            db.close()
-            
+            # 积累满一批立即触发写入，否则由定时任务兜底
+            if pending >= settings.embedding_batch_size:
+                flush_embedding_batch.delay()
+        
+        logger.info(f"照片 {photo_id} 嵌入向量生成完成")
+        
+        return {
+            "photo_id": photo_id,
+            "embedding_length": embedding.shape[0] if embedding is not None else 0,
+            "status": "success"
+        }
+    
     except Exception as e:
         logger.error(f"嵌入向量生成失败: {e}")
         raise
 
 
+@celery_app.task(bind=True)
+def flush_embedding_batch(self, max_items: int = None):
+    """从Redis队列批量取出向量并写入ChromaDB"""
+    try:
+        from app.services.vector_service import get_vector_service, get_async_vector_service
+        
+        max_items = max_items or settings.embedding_batch_size
+        r = get_redis()
+        
+        # 原子地取出最早入队的 max_items 条
+        pipe = r.pipeline()
+        pipe.lrange(EMBEDDING_PENDING_KEY, -max_items, -1)
+        pipe.ltrim(EMBEDDING_PENDING_KEY, 0, -max_items - 1)
+        raw_items, _ = pipe.execute()
+        
+        if not raw_items:
+            return {"status": "success", "count": 0}
+        
+        # LPUSH 使最早的元素位于尾部，倒序后按入队顺序写入
+        items = []
+        for raw in reversed(raw_items):
+            message = json.loads(raw)
+            items.append((message["photo_id"], decode_embedding(message["embedding"]), message["metadata"]))
+        
+        # HTTP模式下各子批次并发写入Chroma服务
+        if settings.chroma_mode == "http":
+            success = asyncio.run(get_async_vector_service().add_photo_embeddings_batch(items))
+        else:
+            success = get_vector_service().add_photo_embeddings_batch(items)
+        
+        if not success:
+            # 写入失败，放回队列尾部等待下次重试
+            r.rpush(EMBEDDING_PENDING_KEY, *raw_items)
+            raise Exception("批量写入向量失败")
+        
+        logger.info(f"批量写入向量完成: {len(items)} 条")
+        
+        return {"status": "success", "count": len(items)}
+    
+    except Exception as e:
+        logger.error(f"批量写入向量失败: {e}")
+        raise
+
+
 @celery_app.task
 def cleanup_old_tasks():
     """清理旧任务的定时任务"""
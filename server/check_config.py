@@ -5,6 +5,7 @@
 import sys
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 # 添加项目根目录到Python路径
@@ -147,6 +148,20 @@ def print_config_summary():
     logger.info(f"  - 设备: {settings.device}")
 
 
+def run_check(name, check_func):
+    """执行单项检查，异常视为失败"""
+    try:
+        result = check_func()
+        if result:
+            logger.info(f"✅ {name} 检查通过")
+        else:
+            logger.error(f"❌ {name} 检查失败")
+        return result
+    except Exception as e:
+        logger.error(f"❌ {name} 检查异常: {e}")
+        return False
+
+
 def main():
     """主函数"""
     logger.info("🚀 Momento AI Photo Management System 配置检查")
@@ -161,19 +176,15 @@ def main():
         ("AI模型配置", check_ai_models),
     ]
     
-    results = []
-    for name, check_func in checks:
-        logger.info(f"\n🔍 检查 {name}...")
-        try:
-            result = check_func()
-            results.append((name, result))
-            if result:
-                logger.info(f"✅ {name} 检查通过")
-            else:
-                logger.error(f"❌ {name} 检查失败")
-        except Exception as e:
-            logger.error(f"❌ {name} 检查异常: {e}")
-            results.append((name, False))
+    # 各项检查互相独立，并发执行，总耗时取决于最慢的一项
+    outcomes = {}
+    with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+        futures = {executor.submit(run_check, name, check_func): name for name, check_func in checks}
+        for future in as_completed(futures):
+            outcomes[futures[future]] = future.result()
+    
+    # 结果按原检查顺序汇总
+    results = [(name, outcomes[name]) for name, _ in checks]
     
     # 打印配置摘要
     print_config_summary()
@@ -12,10 +12,83 @@ import os
 sys.path.append(os.path.dirname(__file__))
 
 from app.database import SessionLocal
-from app.models import Photo
-from sqlalchemy import desc, func
+from sqlalchemy import text
 import json
-from datetime import datetime
+
+
+# 一次往返取回全部报告数据：各 CTE 直接查 photos，分别走 created_at/taken_at 索引、
+# exif_data 的 GIN 索引（@? jsonpath）和 (exif_data->>'camera') 表达式索引
+EXIF_REPORT_SQL = text("""
+WITH stats AS (
+    SELECT count(*) AS total,
+           count(exif_data) AS with_exif,
+           count(taken_at) AS with_taken_at
+    FROM photos
+),
+recent AS (
+    SELECT id, filename, taken_at, created_at, exif_data
+    FROM photos
+    ORDER BY created_at DESC
+    LIMIT 5
+),
+by_taken_at AS (
+    SELECT id, filename, taken_at, created_at, exif_data
+    FROM photos
+    WHERE taken_at IS NOT NULL
+    ORDER BY taken_at DESC
+    LIMIT 5
+),
+with_gps AS (
+    SELECT id, filename, taken_at, created_at, exif_data
+    FROM photos
+    WHERE exif_data @? '$.latitude ? (@ != null)'
+    ORDER BY created_at DESC
+    LIMIT 5
+),
+cameras AS (
+    SELECT exif_data ->> 'camera' AS camera, count(*) AS count
+    FROM photos
+    WHERE exif_data ->> 'camera' IS NOT NULL
+    GROUP BY exif_data ->> 'camera'
+)
+SELECT json_build_object(
+    'stats', (SELECT row_to_json(stats) FROM stats),
+    'recent', (
+        SELECT coalesce(json_agg(json_build_object(
+            'id', id, 'filename', filename, 'exif_data', exif_data,
+            'created_at', to_char(created_at, 'YYYY-MM-DD HH24:MI:SS'),
+            'taken_at', to_char(taken_at, 'YYYY-MM-DD HH24:MI:SS')
+        ) ORDER BY created_at DESC), '[]'::json)
+        FROM recent
+    ),
+    'by_taken_at', (
+        SELECT coalesce(json_agg(json_build_object(
+            'filename', filename, 'exif_data', exif_data,
+            'taken_at', to_char(taken_at, 'YYYY-MM-DD HH24:MI:SS')
+        ) ORDER BY taken_at DESC), '[]'::json)
+        FROM by_taken_at
+    ),
+    'with_gps', (
+        SELECT coalesce(json_agg(json_build_object(
+            'filename', filename, 'exif_data', exif_data
+        ) ORDER BY created_at DESC), '[]'::json)
+        FROM with_gps
+    ),
+    'cameras', (
+        SELECT coalesce(json_agg(json_build_object(
+            'camera', camera, 'count', count
+        ) ORDER BY count DESC), '[]'::json)
+        FROM cameras
+    )
+)
+""")
+
+
+def format_exif(exif_data: dict) -> str:
+    """EXIF转JSON：终端输出时缩进排版，重定向到文件/管道时输出紧凑格式"""
+    if sys.stdout.isatty():
+        return json.dumps(exif_data, ensure_ascii=False, indent=6)
+    return json.dumps(exif_data, ensure_ascii=False)
 
 def main():
     db = SessionLocal()
@@ -25,10 +98,15 @@ def main():
         print('📷 Momento 照片EXIF信息查询')
         print('='*70 + '\n')
         
+        report = db.execute(EXIF_REPORT_SQL).scalar_one()
+        if isinstance(report, str):
+            report = json.loads(report)
+        stats = report['stats']
+        
         # 1. 总体统计
-        total_photos = db.query(func.count(Photo.id)).scalar()
-        photos_with_exif = db.query(func.count(Photo.id)).filter(Photo.exif_data.isnot(None)).scalar()
-        photos_with_taken_at = db.query(func.count(Photo.id)).filter(Photo.taken_at.isnot(None)).scalar()
+        total_photos = stats['total']
+        photos_with_exif = stats['with_exif']
+        photos_with_taken_at = stats['with_taken_at']
         
         print('📊 总体统计:')
         print(f'  总照片数: {total_photos}')
@@ -45,28 +123,26 @@ def main():
         print('📸 最新上传的5张照片:')
         print('='*70 + '\n')
         
-        recent_photos = db.query(Photo).order_by(desc(Photo.created_at)).limit(5).all()
-        
-        for i, photo in enumerate(recent_photos, 1):
-            print(f'{i}. 照片ID: {photo.id}')
-            print(f'   文件名: {photo.filename}')
-            print(f'   上传时间: {photo.created_at.strftime("%Y-%m-%d %H:%M:%S")}')
+        for i, photo in enumerate(report['recent'], 1):
+            exif_data = photo['exif_data']
+            print(f'{i}. 照片ID: {photo["id"]}')
+            print(f'   文件名: {photo["filename"]}')
+            print(f'   上传时间: {photo["created_at"]}')
             
-            if photo.taken_at:
-                print(f'   📅 拍摄时间: {photo.taken_at.strftime("%Y-%m-%d %H:%M:%S")}')
+            if photo['taken_at']:
+                print(f'   📅 拍摄时间: {photo["taken_at"]}')
             else:
                 print(f'   📅 拍摄时间: 未记录')
             
-            if photo.exif_data:
-                camera = photo.exif_data.get('camera', '未知')
-                location = photo.exif_data.get('location', '未知')
+            if exif_data:
+                camera = exif_data.get('camera', '未知')
+                location = exif_data.get('location', '未知')
                 print(f'   📷 相机: {camera}')
                 print(f'   📍 位置: {location}')
                 
                 # 显示完整EXIF（格式化）
                 print(f'   📊 完整EXIF:')
-                exif_json = json.dumps(photo.exif_data, ensure_ascii=False, indent=6)
-                for line in exif_json.split('\n'):
+                for line in format_exif(exif_data).split('\n'):
                     print(f'      {line}')
             else:
                 print(f'   📷 EXIF数据: 未记录')
@@ -74,38 +150,36 @@ def main():
             print('-'*70 + '\n')
         
         # 3. 有拍摄时间的照片
-        photos_with_time = db.query(Photo).filter(Photo.taken_at.isnot(None)).order_by(desc(Photo.taken_at)).limit(5).all()
-        
+        photos_with_time = report['by_taken_at']
         if photos_with_time:
             print('='*70)
             print('📅 按拍摄时间排序（最新5张）:')
             print('='*70 + '\n')
             
             for i, photo in enumerate(photos_with_time, 1):
-                print(f'{i}. {photo.filename}')
-                print(f'   拍摄时间: {photo.taken_at.strftime("%Y-%m-%d %H:%M:%S")}')
-                if photo.exif_data and photo.exif_data.get('camera'):
-                    print(f'   相机: {photo.exif_data.get("camera")}')
+                exif_data = photo['exif_data']
+                print(f'{i}. {photo["filename"]}')
+                print(f'   拍摄时间: {photo["taken_at"]}')
+                if exif_data and exif_data.get('camera'):
+                    print(f'   相机: {exif_data.get("camera")}')
                 print()
         
         # 4. 有GPS位置的照片
-        photos_with_gps = db.query(Photo).filter(
-            Photo.exif_data['latitude'].astext.isnot(None)
-        ).order_by(desc(Photo.created_at)).limit(5).all()
-        
+        photos_with_gps = report['with_gps']
         if photos_with_gps:
             print('='*70)
             print('📍 有GPS位置的照片:')
             print('='*70 + '\n')
             
             for i, photo in enumerate(photos_with_gps, 1):
-                print(f'{i}. {photo.filename}')
-                if photo.exif_data:
-                    lat = photo.exif_data.get('latitude')
-                    lng = photo.exif_data.get('longitude')
+                exif_data = photo['exif_data']
+                print(f'{i}. {photo["filename"]}')
+                if exif_data:
+                    lat = exif_data.get('latitude')
+                    lng = exif_data.get('longitude')
                     if lat and lng:
                         print(f'   GPS: {lat}, {lng}')
-                    location = photo.exif_data.get('location')
+                    location = exif_data.get('location')
                     if location:
                         print(f'   位置: {location}')
                 print()
@@ -115,16 +189,7 @@ def main():
         print('📷 相机型号统计:')
         print('='*70 + '\n')
         
-        camera_stats = db.query(
-            Photo.exif_data['camera'].astext.label('camera'),
-            func.count(Photo.id).label('count')
-        ).filter(
-            Photo.exif_data['camera'].astext.isnot(None)
-        ).group_by(
-            Photo.exif_data['camera'].astext
-        ).order_by(
-            desc('count')
-        ).all()
+        camera_stats = [(row['camera'], row['count']) for row in report['cameras']]
         
         if camera_stats:
             for camera, count in camera_stats:
@@ -3,8 +3,13 @@
 Momento AI Photo Management System - ASCII Logo
 精美的启动Logo显示
 """
+from functools import lru_cache
 from typing import List
 import os
+import sys
+
+# NO_COLOR 约定：设置后禁用彩色输出（导入时读取一次）
+NO_COLOR = bool(os.getenv('NO_COLOR'))
 
 
 class MomentoLogo:
@@ -37,6 +42,10 @@ class MomentoLogo:
     SUBTITLE = "AI-Powered Photo Classification & Management System"
     SUBTITLE_CN = "AI 智能照片分类与管理系统"
     
+    # 渲染好的Logo文本（类定义后预先生成，见 _render_colored_logo / _render_plain_logo）
+    _COLORED = ""
+    _PLAIN = ""
+    
     @classmethod
     def print_logo(cls, colored: bool = True) -> None:
         """
@@ -46,7 +55,7 @@ class MomentoLogo:
             colored: 是否使用彩色输出
         """
         # 检测是否支持彩色输出
-        if not colored or os.getenv('NO_COLOR'):
+        if not colored or NO_COLOR:
             cls._print_plain_logo()
             return
         
@@ -56,31 +65,35 @@ class MomentoLogo:
     @classmethod
     def _print_colored_logo(cls) -> None:
         """打印彩色Logo"""
-        print()
+        sys.stdout.write(cls._COLORED)
+    
+    @classmethod
+    def _print_plain_logo(cls) -> None:
+        """打印纯文本Logo"""
+        sys.stdout.write(cls._PLAIN)
+    
+    @classmethod
+    def _render_colored_logo(cls) -> str:
+        """生成彩色Logo文本"""
+        c = cls.COLORS
         
         # 渐变颜色效果
         colors = ['cyan', 'cyan', 'blue', 'blue', 'magenta', 'magenta']
-        
-        for i, line in enumerate(cls.LOGO_LINES):
-            color = colors[i]
-            print(f"{cls.COLORS[color]}{cls.COLORS['bold']}{line}{cls.COLORS['reset']}")
+        lines = [f"{c[color]}{c['bold']}{line}{c['reset']}" for color, line in zip(colors, cls.LOGO_LINES)]
         
         # 副标题
-        print()
-        print(f"{cls.COLORS['gray']}  {cls.SUBTITLE}{cls.COLORS['reset']}")
-        print(f"{cls.COLORS['gray']}  {cls.SUBTITLE_CN}{cls.COLORS['reset']}")
-        print()
+        return "\n" + "\n".join(lines) + "\n\n" + (
+            f"{c['gray']}  {cls.SUBTITLE}{c['reset']}\n"
+            f"{c['gray']}  {cls.SUBTITLE_CN}{c['reset']}\n\n"
+        )
     
     @classmethod
-    def _print_plain_logo(cls) -> None:
-        """打印纯文本Logo"""
-        print()
-        for line in cls.LOGO_LINES:
-            print(line)
-        print()
-        print(f"  {cls.SUBTITLE}")
-        print(f"  {cls.SUBTITLE_CN}")
-        print()
+    def _render_plain_logo(cls) -> str:
+        """生成纯文本Logo"""
+        return "\n" + "\n".join(cls.LOGO_LINES) + "\n\n" + (
+            f"  {cls.SUBTITLE}\n"
+            f"  {cls.SUBTITLE_CN}\n\n"
+        )
     
     @classmethod
     def print_banner(cls, version: str = "1.0.0", colored: bool = True) -> None:
@@ -91,20 +104,35 @@ class MomentoLogo:
             version: 版本号
             colored: 是否使用彩色
         """
-        cls.print_logo(colored)
-        
-        if colored and not os.getenv('NO_COLOR'):
+        colored = colored and not NO_COLOR
+        sys.stdout.write(cls._render_banner(version, colored))
+        sys.stdout.flush()
+    
+    @classmethod
+    @lru_cache(maxsize=8)
+    def _render_banner(cls, version: str, colored: bool) -> str:
+        """生成完整横幅文本（Logo + 版本信息栏），按版本和颜色缓存"""
+        if colored:
             c = cls.COLORS
-            print(f"{c['gray']}{'═' * 76}{c['reset']}")
-            print(f"{c['green']}  📸 Version: {c['bold']}{version}{c['reset']}  {c['gray']}|{c['reset']}  "
-                  f"{c['yellow']}🤖 Powered by YAN{c['reset']}  {c['gray']}|{c['reset']}  "
-                  f"{c['blue']}✨ Smart Classification{c['reset']}")
-            print(f"{c['gray']}{'═' * 76}{c['reset']}")
-        else:
-            print("=" * 76)
-            print(f"  📸 Version: {version}  |  🤖 Powered by AI  |  ✨ Smart Classification")
-            print("=" * 76)
-        print()
+            footer = (
+                f"{c['gray']}{'═' * 76}{c['reset']}\n"
+                f"{c['green']}  📸 Version: {c['bold']}{version}{c['reset']}  {c['gray']}|{c['reset']}  "
+                f"{c['yellow']}🤖 Powered by YAN{c['reset']}  {c['gray']}|{c['reset']}  "
+                f"{c['blue']}✨ Smart Classification{c['reset']}\n"
+                f"{c['gray']}{'═' * 76}{c['reset']}\n"
+            )
+            return cls._COLORED + footer + "\n"
+        
+        footer = (
+            "=" * 76 + "\n"
+            f"  📸 Version: {version}  |  🤖 Powered by AI  |  ✨ Smart Classification\n"
+            + "=" * 76 + "\n"
+        )
+        return cls._PLAIN + footer + "\n"
+
+
+MomentoLogo._COLORED = MomentoLogo._render_colored_logo()
+MomentoLogo._PLAIN = MomentoLogo._render_plain_logo()
 
 
 class SimpleLogo:
@@ -169,8 +197,6 @@ def demo():
 
 
 if __name__ == "__main__":
-    import sys
-    
     if len(sys.argv) > 1 and sys.argv[1] == "demo":
         # 演示模式
         demo()
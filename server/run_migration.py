@@ -8,9 +8,111 @@ import sys
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
 
+from app.config import with_database_driver
+
 # 加载环境变量
 load_dotenv()
 
+# 查询语句在模块加载时构造一次（TextClause），执行时直接复用
+VERSION_SQL = text("SELECT version()")
+
+# 迁移结果检查：直接查询 pg_catalog（不经过 information_schema 视图），
+# 一次取回相关表的全部列、约束、索引和函数名，存在性判断在本地集合中完成
+MIGRATION_CHECK_TABLES = ['photos', 'tags', 'photo_tags']
+
+MIGRATION_INTROSPECT_SQL = text("""
+WITH rel AS (
+    SELECT oid, relname
+    FROM pg_class
+    WHERE relnamespace = 'public'::regnamespace
+      AND relkind = 'r'
+      AND relname = ANY(:tables)
+)
+SELECT
+    (
+        SELECT COALESCE(array_agg(rel.relname || '.' || a.attname), '{}')
+        FROM pg_attribute a
+        JOIN rel ON rel.oid = a.attrelid
+        WHERE a.attnum > 0 AND NOT a.attisdropped
+    ) AS columns,
+    (
+        SELECT COALESCE(array_agg(rel.relname || '.' || c.conname), '{}')
+        FROM pg_constraint c
+        JOIN rel ON rel.oid = c.conrelid
+    ) AS constraints,
+    (
+        SELECT COALESCE(array_agg(ic.relname::text), '{}')
+        FROM pg_index i
+        JOIN rel ON rel.oid = i.indrelid
+        JOIN pg_class ic ON ic.oid = i.indexrelid
+    ) AS indexes,
+    (
+        SELECT COALESCE(array_agg(proname::text), '{}')
+        FROM pg_proc
+        WHERE proname = ANY(:functions)
+    ) AS functions
+""")
+
+# (显示名称, 对象类型, 对象名)
+MIGRATION_CHECKS = [
+    ("photos表 - taken_at字段", "columns", "photos.taken_at"),
+    ("photos表 - location字段", "columns", "photos.location"),
+    ("photos表 - ai_status字段", "columns", "photos.ai_status"),
+    ("photos表 - search_vector字段", "columns", "photos.search_vector"),
+    ("tags表 - use_count字段", "columns", "tags.use_count"),
+    ("photo_tags表 - source约束", "constraints", "photo_tags.chk_photo_tags_source"),
+    ("全文搜索索引", "indexes", "idx_photos_search"),
+    ("描述三元组索引", "indexes", "idx_photos_caption_trgm"),
+    ("搜索函数", "functions", "search_photos"),
+]
+
+# 迁移后统计：照片数、标签数、AI处理状态分布、热门标签一次取回
+# ai CTE 被引用两次会被物化，照片总数由分组结果求和，photos 只扫描一次
+MIGRATION_STATS_SQL = text("""
+WITH ai AS (
+    SELECT ai_status, COUNT(*) AS cnt
+    FROM photos
+    GROUP BY ai_status
+),
+top AS (
+    SELECT name, zh, use_count
+    FROM tags
+    WHERE use_count > 0
+    ORDER BY use_count DESC
+    LIMIT 5
+)
+SELECT
+    (SELECT COALESCE(SUM(cnt), 0)::bigint FROM ai) AS photo_count,
+    (SELECT COUNT(*) FROM tags) AS tag_count,
+    (
+        SELECT COALESCE(json_agg(json_build_array(ai_status, cnt)), '[]'::json)
+        FROM ai
+        WHERE ai_status IS NOT NULL
+    ) AS ai_status_counts,
+    (
+        SELECT COALESCE(json_agg(json_build_array(name, zh, use_count) ORDER BY use_count DESC), '[]'::json)
+        FROM top
+    ) AS top_tags
+""")
+
+def migrate_vector_collections():
+    """把旧版共享向量集合按用户拆分到各自集合（没有共享集合时什么也不做）"""
+    from app.services.vector_service import get_vector_service
+    
+    print("🧭 迁移旧版共享向量集合...")
+    try:
+        moved = get_vector_service().migrate_shared_collection()
+    except Exception as e:
+        # 数据库迁移已提交，向量迁移失败不回滚，可修复后重新执行本脚本
+        print(f"   ⚠️  向量集合迁移失败: {e}")
+        print("   可排查ChromaDB后重新运行本脚本（已迁移的向量不会重复写入）\n")
+        return
+    
+    if moved:
+        print(f"   ✅ 已迁移 {moved} 条向量到用户集合\n")
+    else:
+        print("   ✅ 未发现共享集合，无需迁移\n")
+
 def run_migration():
     """执行数据库迁移"""
     
@@ -28,132 +130,108 @@ def run_migration():
     print(f"   URL: {database_url.split('@')[1] if '@' in database_url else database_url}")
     
     try:
-        # 创建数据库引擎
-        engine = create_engine(database_url)
+        # 创建数据库引擎：连接测试、迁移、验证、统计共用同一条连接
+        engine = create_engine(with_database_driver(database_url), pool_size=1, max_overflow=0)
         
-        # 测试连接
         with engine.connect() as conn:
-            result = conn.execute(text("SELECT version()"))
-            version = result.fetchone()[0]
+            # 测试连接
+            version = conn.execute(VERSION_SQL).scalar()
+            conn.rollback()  # 结束自动开启的只读事务，迁移在下方显式事务中执行
             print(f"✅ 数据库连接成功")
             print(f"   版本: {version.split(',')[0]}\n")
-        
-        # 读取迁移SQL文件
-        sql_file = os.path.join(os.path.dirname(__file__), 'sql', 'migration_optimize_for_classification.sql')
-        
-        if not os.path.exists(sql_file):
-            print(f"❌ 错误: 找不到迁移文件")
-            print(f"   路径: {sql_file}")
-            sys.exit(1)
-        
-        print(f"📄 读取迁移脚本...")
-        print(f"   文件: {sql_file}\n")
-        
-        with open(sql_file, 'r', encoding='utf-8') as f:
-            migration_sql = f.read()
-        
-        # 询问用户确认
-        print("⚠️  准备执行数据库迁移")
-        print("\n将要执行的操作：")
-        print("  1. 修改 photos 表（添加字段、修改类型）")
-        print("  2. 修改 tags 表（添加统计字段）")
-        print("  3. 优化 photo_tags 表（统一source值）")
-        print("  4. 创建全文搜索索引")
-        print("  5. 创建统计视图和触发器")
-        print("  6. 创建搜索辅助函数\n")
-        
-        response = input("确认执行迁移？(yes/no): ").strip().lower()
-        
-        if response not in ['yes', 'y']:
-            print("\n❌ 迁移已取消")
-            sys.exit(0)
-        
-        # 执行迁移
-        print("\n🚀 开始执行迁移...\n")
-        
-        with engine.begin() as conn:
-            # 执行SQL
-            conn.execute(text(migration_sql))
+            
+            # 读取迁移SQL文件
+            sql_file = os.path.join(os.path.dirname(__file__), 'sql', 'migration_optimize_for_classification.sql')
+            
+            if not os.path.exists(sql_file):
+                print(f"❌ 错误: 找不到迁移文件")
+                print(f"   路径: {sql_file}")
+                sys.exit(1)
+            
+            print(f"📄 读取迁移脚本...")
+            print(f"   文件: {sql_file}\n")
+            
+            with open(sql_file, 'r', encoding='utf-8') as f:
+                migration_sql = f.read()
+            
+            # 询问用户确认
+            print("⚠️  准备执行数据库迁移")
+            print("\n将要执行的操作：")
+            print("  1. 修改 photos 表（添加字段、修改类型）")
+            print("  2. 修改 tags 表（添加统计字段）")
+            print("  3. 优化 photo_tags 表（统一source值）")
+            print("  4. 创建全文搜索索引")
+            print("  5. 创建统计视图和触发器")
+            print("  6. 创建搜索辅助函数")
+            print("  7. 迁移旧版共享向量集合到用户集合\n")
+            
+            response = input("确认执行迁移？(yes/no): ").strip().lower()
+            
+            if response not in ['yes', 'y']:
+                print("\n❌ 迁移已取消")
+                sys.exit(0)
+            
+            # 执行迁移
+            print("\n🚀 开始执行迁移...\n")
+            
+            with conn.begin():
+                # 执行SQL
+                conn.execute(text(migration_sql))
             print("✅ 迁移执行成功！\n")
-        
-        # 验证迁移结果
-        print("🔍 验证迁移结果...\n")
-        
-        with engine.connect() as conn:
-            # 检查新增字段
-            checks = [
-                ("photos表 - taken_at字段", 
-                 "SELECT column_name FROM information_schema.columns WHERE table_name='photos' AND column_name='taken_at'"),
-                ("photos表 - location字段", 
-                 "SELECT column_name FROM information_schema.columns WHERE table_name='photos' AND column_name='location'"),
-                ("photos表 - ai_status字段", 
-                 "SELECT column_name FROM information_schema.columns WHERE table_name='photos' AND column_name='ai_status'"),
-                ("tags表 - use_count字段", 
-                 "SELECT column_name FROM information_schema.columns WHERE table_name='tags' AND column_name='use_count'"),
-                ("photo_tags表 - source约束", 
-                 "SELECT constraint_name FROM information_schema.table_constraints WHERE table_name='photo_tags' AND constraint_name='chk_photo_tags_source'"),
-                ("搜索函数", 
-                 "SELECT proname FROM pg_proc WHERE proname='search_photos'"),
-            ]
+            
+            # 验证迁移结果
+            print("🔍 验证迁移结果...\n")
+            
+            row = conn.execute(MIGRATION_INTROSPECT_SQL, {
+                "tables": MIGRATION_CHECK_TABLES,
+                "functions": [name for _, kind, name in MIGRATION_CHECKS if kind == "functions"],
+            }).fetchone()._mapping
+            existing = {kind: set(row[kind]) for kind in ("columns", "constraints", "indexes", "functions")}
             
             all_ok = True
-            for check_name, check_sql in checks:
-                result = conn.execute(text(check_sql))
-                if result.fetchone():
+            for check_name, kind, name in MIGRATION_CHECKS:
+                if name in existing[kind]:
                     print(f"   ✅ {check_name}")
                 else:
                     print(f"   ❌ {check_name} - 未找到")
                     all_ok = False
-        
-        print("\n" + "=" * 60)
-        if all_ok:
-            print("🎉 迁移完成！所有检查通过")
-        else:
-            print("⚠️  迁移完成，但部分检查未通过，请手动检查")
-        print("=" * 60)
-        
-        # 显示统计信息
-        print("\n📊 数据库统计:")
-        with engine.connect() as conn:
+            
+            print("\n" + "=" * 60)
+            if all_ok:
+                print("🎉 迁移完成！所有检查通过")
+            else:
+                print("⚠️  迁移完成，但部分检查未通过，请手动检查")
+            print("=" * 60)
+            
+            # 显示统计信息
+            print("\n📊 数据库统计:")
+            stats = conn.execute(MIGRATION_STATS_SQL).fetchone()._mapping
+            
             # 照片数量
-            result = conn.execute(text("SELECT COUNT(*) FROM photos"))
-            photo_count = result.fetchone()[0]
-            print(f"   照片总数: {photo_count}")
+            print(f"   照片总数: {stats['photo_count']}")
             
             # 标签数量
-            result = conn.execute(text("SELECT COUNT(*) FROM tags"))
-            tag_count = result.fetchone()[0]
-            print(f"   标签总数: {tag_count}")
+            print(f"   标签总数: {stats['tag_count']}")
             
             # AI处理状态统计
-            result = conn.execute(text("""
-                SELECT ai_status, COUNT(*) 
-                FROM photos 
-                WHERE ai_status IS NOT NULL 
-                GROUP BY ai_status
-            """))
             print(f"\n   AI处理状态:")
-            for status, count in result:
+            for status, count in stats['ai_status_counts']:
                 print(f"     - {status}: {count}")
             
             # 标签使用统计
-            result = conn.execute(text("""
-                SELECT name, zh, use_count 
-                FROM tags 
-                WHERE use_count > 0 
-                ORDER BY use_count DESC 
-                LIMIT 5
-            """))
             print(f"\n   热门标签 (Top 5):")
-            for name, zh, count in result:
+            for name, zh, count in stats['top_tags']:
                 tag_display = zh if zh else name
                 print(f"     - {tag_display}: {count}次")
-        
-        print("\n💡 提示:")
-        print("   - 新增字段可能需要更新代码中的模型定义")
-        print("   - 可以使用 search_photos() 函数进行智能搜索")
-        print("   - 标签使用次数会自动更新\n")
-        
+            
+            print()
+            migrate_vector_collections()
+            
+            print("💡 提示:")
+            print("   - 新增字段可能需要更新代码中的模型定义")
+            print("   - 可以使用 search_photos() 函数进行智能搜索")
+            print("   - 标签使用次数会自动更新\n")
+            
     except Exception as e:
         print(f"\n❌ 迁移失败: {e}")
         import traceback
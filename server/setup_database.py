@@ -4,70 +4,61 @@
 """
 import os
 import sys
-import psycopg2
-from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
-from sqlalchemy import create_engine, text
-from app.config import settings
+import time
 import logging
+from urllib.parse import urlparse, unquote
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 数据库结构版本：修改 sql/init_simple.sql 或 sql/tags_seed.csv 后递增，
+# 版本一致时 start.py 跳过整个初始化流程
+SCHEMA_VERSION = "2"
+
 
 def create_database():
     """创建数据库"""
+    import psycopg2
+    from psycopg2 import sql
+    from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+    from app.config import settings
+    
     try:
-        # 解析数据库URL
-        db_url = settings.database_url
-        if db_url.startswith('postgresql://'):
-            # 提取连接信息
-            parts = db_url.replace('postgresql://', '').split('/')
-            if len(parts) >= 2:
-                auth_host = parts[0]
-                db_name = parts[1]
-                
-                if '@' in auth_host:
-                    auth, host = auth_host.split('@')
-                    if ':' in auth:
-                        user, password = auth.split(':')
-                    else:
-                        user, password = auth, ''
-                else:
-                    user, password = 'postgres', ''
-                    host = auth_host
-                
-                # 连接到postgres数据库创建新数据库
-                conn = psycopg2.connect(
-                    host=host.split(':')[0],
-                    port=int(host.split(':')[1]) if ':' in host else 5432,
-                    user=user,
-                    password=password,
-                    database='postgres'
-                )
-                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
-                
-                cursor = conn.cursor()
-                
-                # 检查数据库是否存在
-                cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (db_name,))
-                exists = cursor.fetchone()
-                
-                if not exists:
-                    cursor.execute(f"CREATE DATABASE {db_name}")
-                    logger.info(f"✅ 数据库 '{db_name}' 创建成功")
-                else:
-                    logger.info(f"ℹ️  数据库 '{db_name}' 已存在")
-                
-                cursor.close()
-                conn.close()
-                
-            else:
-                logger.error("❌ 数据库URL格式错误")
-                return False
-        else:
+        # 解析数据库URL（postgresql+asyncpg:// 等驱动前缀同样接受；用户名/密码按URL编码解码）
+        url = urlparse(settings.database_url)
+        db_name = url.path.lstrip('/')
+        if not url.scheme.startswith('postgres'):
             logger.error("❌ 不支持的数据库类型")
             return False
-            
+        if not db_name:
+            logger.error("❌ 数据库URL格式错误")
+            return False
+        
+        # 连接到postgres数据库创建新数据库
+        conn = psycopg2.connect(
+            host=url.hostname,
+            port=url.port or 5432,
+            user=unquote(url.username) if url.username else 'postgres',
+            password=unquote(url.password) if url.password else '',
+            database='postgres'
+        )
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        
+        cursor = conn.cursor()
+        
+        # 检查数据库是否存在
+        cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (db_name,))
+        exists = cursor.fetchone()
+        
+        if not exists:
+            cursor.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(db_name)))
+            logger.info(f"✅ 数据库 '{db_name}' 创建成功")
+        else:
+            logger.info(f"ℹ️  数据库 '{db_name}' 已存在")
+        
+        cursor.close()
+        conn.close()
+        
         return True
         
     except Exception as e:
@@ -77,9 +68,12 @@ def create_database():
 
 def run_sql_script():
     """执行SQL脚本"""
+    from sqlalchemy import create_engine
+    from app.config import settings
+    
     try:
         # 创建数据库引擎
-        engine = create_engine(settings.database_url)
+        engine = create_engine(settings.sync_database_url)
         
         # 读取SQL文件
         sql_file = os.path.join(os.path.dirname(__file__), 'sql', 'init_simple.sql')
@@ -91,22 +85,15 @@ def run_sql_script():
         with open(sql_file, 'r', encoding='utf-8') as f:
             sql_content = f.read()
         
-        # 分割SQL语句（按分号分割）
-        sql_statements = [stmt.strip() for stmt in sql_content.split(';') if stmt.strip()]
+        # 整个脚本作为一条多语句字符串提交（psycopg2 简单查询协议），由服务端解析语句边界，
+        # 正确处理 $$ 函数体、字符串和注释中的分号；任一语句失败时整体回滚。
+        # 不在客户端拆分语句：拆分后每条语句一次往返，且需要额外的SQL解析依赖
+        logger.info(f"📄 执行SQL脚本: {os.path.basename(sql_file)}")
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            conn.exec_driver_sql(sql_content)
         
-        # 执行SQL语句
-        with engine.connect() as conn:
-            for i, sql in enumerate(sql_statements):
-                if sql.strip():
-                    try:
-                        conn.execute(text(sql))
-                        logger.info(f"✅ 执行SQL语句 {i+1}/{len(sql_statements)}")
-                    except Exception as e:
-                        logger.warning(f"⚠️  SQL语句执行警告: {e}")
-                        # 继续执行其他语句
-            
-            conn.commit()
-        logger.info("✅ 数据库初始化完成")
+        logger.info(f"✅ 数据库初始化完成 ({time.perf_counter() - started:.2f}s)")
         return True
         
     except Exception as e:
@@ -114,10 +101,96 @@ def run_sql_script():
         return False
 
 
+def seed_tags():
+    """导入基础标签数据（COPY 批量导入）"""
+    from sqlalchemy import create_engine
+    from app.config import settings
+    
+    seed_file = os.path.join(os.path.dirname(__file__), 'sql', 'tags_seed.csv')
+    
+    if not os.path.exists(seed_file):
+        logger.error(f"❌ 标签种子文件不存在: {seed_file}")
+        return False
+    
+    engine = create_engine(settings.sync_database_url)
+    raw_conn = engine.raw_connection()
+    try:
+        cursor = raw_conn.cursor()
+        # COPY 不支持 ON CONFLICT：先导入临时表，再一次性合并，已存在的标签跳过
+        cursor.execute("""
+            CREATE TEMP TABLE tags_seed (
+                name VARCHAR(100), zh VARCHAR(100), ja VARCHAR(100),
+                category VARCHAR(50), description TEXT
+            ) ON COMMIT DROP
+        """)
+        with open(seed_file, 'r', encoding='utf-8') as f:
+            cursor.copy_expert(
+                "COPY tags_seed (name, zh, ja, category, description) FROM STDIN WITH (FORMAT csv)",
+                f
+            )
+        cursor.execute("""
+            INSERT INTO tags (name, zh, ja, category, description)
+            SELECT name, zh, ja, category, description FROM tags_seed
+            ON CONFLICT (name) DO NOTHING
+        """)
+        inserted = cursor.rowcount
+        raw_conn.commit()
+        logger.info(f"✅ 基础标签导入完成，新增 {inserted} 条")
+        return True
+    except Exception as e:
+        raw_conn.rollback()
+        logger.error(f"❌ 导入基础标签失败: {e}")
+        return False
+    finally:
+        raw_conn.close()
+
+
+def schema_is_current():
+    """检查数据库是否已按当前结构版本初始化"""
+    from sqlalchemy import create_engine, text
+    from app.config import settings
+    
+    try:
+        engine = create_engine(settings.sync_database_url)
+        try:
+            with engine.connect() as conn:
+                version = conn.execute(
+                    text("SELECT value FROM app_schema_meta WHERE key = 'schema_version'")
+                ).scalar()
+        finally:
+            engine.dispose()
+    except Exception:
+        # 数据库或版本表不存在，需要执行初始化
+        return False
+    return version == SCHEMA_VERSION
+
+
+def mark_schema_version():
+    """记录当前结构版本"""
+    from sqlalchemy import create_engine, text
+    from app.config import settings
+    
+    try:
+        engine = create_engine(settings.sync_database_url)
+        with engine.begin() as conn:
+            conn.execute(text("""
+                INSERT INTO app_schema_meta (key, value) VALUES ('schema_version', :version)
+                ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = NOW()
+            """), {"version": SCHEMA_VERSION})
+        logger.info(f"✅ 数据库结构版本: {SCHEMA_VERSION}")
+        return True
+    except Exception as e:
+        logger.error(f"❌ 记录结构版本失败: {e}")
+        return False
+
+
 def test_connection():
     """测试数据库连接"""
+    from sqlalchemy import create_engine, text
+    from app.config import settings
+    
     try:
-        engine = create_engine(settings.database_url)
+        engine = create_engine(settings.sync_database_url)
         with engine.connect() as conn:
             result = conn.execute(text("SELECT 1"))
             logger.info("✅ 数据库连接测试成功")
@@ -129,6 +202,8 @@ def test_connection():
 
 def main():
     """主函数"""
+    from app.config import settings
+    
     logger.info("🚀 开始设置数据库...")
     
     # 1. 创建数据库
@@ -141,11 +216,20 @@ def main():
         logger.error("❌ SQL脚本执行失败")
         sys.exit(1)
     
-    # 3. 测试连接
+    # 3. 导入基础标签
+    if not seed_tags():
+        logger.error("❌ 基础标签导入失败")
+        sys.exit(1)
+    
+    # 4. 测试连接
     if not test_connection():
         logger.error("❌ 数据库连接测试失败")
         sys.exit(1)
     
+    # 5. 记录结构版本（之后 start.py 可跳过初始化）
+    if not mark_schema_version():
+        sys.exit(1)
+    
     logger.info("🎉 数据库设置完成！")
     logger.info("📊 数据库信息:")
     logger.info(f"   - 数据库URL: {settings.database_url}")
@@ -103,16 +103,20 @@ CREATE TABLE IF NOT EXISTS user_preferences (
 
 -- 创建索引
 CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username_lower ON users(lower(username));
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_photos_user_id ON photos(user_id);
 CREATE INDEX IF NOT EXISTS idx_photos_created_at ON photos(created_at);
 CREATE INDEX IF NOT EXISTS idx_photos_user_id_created_at ON photos(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_photos_exif_gin ON photos USING gin(exif_data);
+CREATE INDEX IF NOT EXISTS idx_photos_exif_camera ON photos((exif_data ->> 'camera'));
 CREATE INDEX IF NOT EXISTS idx_photos_embedding ON photos USING ivfflat (embedding vector_cosine_ops);
 CREATE INDEX IF NOT EXISTS idx_tags_name ON tags(name);
 CREATE INDEX IF NOT EXISTS idx_tags_category ON tags(category);
 CREATE INDEX IF NOT EXISTS idx_tags_name_category ON tags(name, category);
 CREATE INDEX IF NOT EXISTS idx_photo_tags_confidence ON photo_tags(confidence);
 CREATE INDEX IF NOT EXISTS idx_photo_tags_source ON photo_tags(source);
+CREATE INDEX IF NOT EXISTS idx_photo_tags_tag_id ON photo_tags(tag_id);
 CREATE INDEX IF NOT EXISTS idx_albums_user_id ON albums(user_id);
 CREATE INDEX IF NOT EXISTS idx_albums_created_at ON albums(created_at);
 CREATE INDEX IF NOT EXISTS idx_album_photos_sort_order ON album_photos(album_id, sort_order);
@@ -91,41 +91,30 @@ CREATE TABLE IF NOT EXISTS user_preferences (
     updated_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- 创建结构版本表（setup_database.py 初始化完成后写入 schema_version，start.py 据此跳过重复初始化）
+CREATE TABLE IF NOT EXISTS app_schema_meta (
+    key VARCHAR(50) PRIMARY KEY,
+    value VARCHAR(100) NOT NULL,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
 -- 创建索引
 CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username_lower ON users(lower(username));
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_photos_user_id ON photos(user_id);
 CREATE INDEX IF NOT EXISTS idx_photos_created_at ON photos(created_at);
 CREATE INDEX IF NOT EXISTS idx_photos_user_id_created_at ON photos(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_photos_exif_gin ON photos USING gin(exif_data);
+CREATE INDEX IF NOT EXISTS idx_photos_exif_camera ON photos((exif_data ->> 'camera'));
 CREATE INDEX IF NOT EXISTS idx_tags_name ON tags(name);
 CREATE INDEX IF NOT EXISTS idx_tags_category ON tags(category);
 CREATE INDEX IF NOT EXISTS idx_tags_name_category ON tags(name, category);
 CREATE INDEX IF NOT EXISTS idx_photo_tags_confidence ON photo_tags(confidence);
 CREATE INDEX IF NOT EXISTS idx_photo_tags_source ON photo_tags(source);
+CREATE INDEX IF NOT EXISTS idx_photo_tags_tag_id ON photo_tags(tag_id);
 CREATE INDEX IF NOT EXISTS idx_albums_user_id ON albums(user_id);
 CREATE INDEX IF NOT EXISTS idx_albums_created_at ON albums(created_at);
 CREATE INDEX IF NOT EXISTS idx_album_photos_sort_order ON album_photos(album_id, sort_order);
 
--- 插入基础标签数据
-INSERT INTO tags (name, zh, ja, category, description) VALUES
-('cat', '猫', '猫', 'object', '猫科动物'),
-('dog', '狗', '犬', 'object', '犬科动物'),
-('car', '汽车', '車', 'object', '机动车辆'),
-('tree', '树', '木', 'object', '树木植物'),
-('building', '建筑', '建物', 'object', '建筑物'),
-('person', '人', '人', 'object', '人物'),
-('food', '食物', '食べ物', 'object', '食物'),
-('nature', '自然', '自然', 'scene', '自然风景'),
-('sky', '天空', '空', 'scene', '天空'),
-('water', '水', '水', 'scene', '水体'),
-('mountain', '山', '山', 'scene', '山脉'),
-('beach', '海滩', 'ビーチ', 'scene', '海滩'),
-('city', '城市', '都市', 'scene', '城市景观'),
-('street', '街道', '通り', 'scene', '街道'),
-('indoor', '室内', '屋内', 'scene', '室内场景'),
-('outdoor', '室外', '屋外', 'scene', '室外场景'),
-('red', '红色', '赤', 'color', '红色'),
-('blue', '蓝色', '青', 'color', '蓝色'),
-('green', '绿色', '緑', 'color', '绿色'),
-('yellow', '黄色', '黄', 'color', '黄色')
-ON CONFLICT (name) DO NOTHING;
+-- 基础标签数据见 tags_seed.csv，由 setup_database.py 通过 COPY 导入
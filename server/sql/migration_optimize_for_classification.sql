@@ -97,18 +97,71 @@ ALTER TABLE photo_tags ADD CONSTRAINT chk_photo_tags_source
 
 COMMENT ON COLUMN photo_tags.source IS '标签来源: ai（AI自动生成） 或 manual（用户手动添加）';
 
+-- 3.3 按标签反查照片的索引（主键以 photo_id 开头，无法用于 tag_id 过滤）
+-- 用于按标签查照片、热门标签统计的 GROUP BY tag_id
+CREATE INDEX IF NOT EXISTS idx_photo_tags_tag_id ON photo_tags(tag_id);
+
 -- =====================================================
 -- 4. 创建全文搜索索引（PostgreSQL）
 -- =====================================================
 
--- 4.1 为照片描述创建全文搜索索引
-CREATE INDEX IF NOT EXISTS idx_photos_caption_fts ON photos 
-USING gin(to_tsvector('simple', COALESCE(caption, '')));
+-- 4.1 照片全文搜索：存储 tsvector 列，由触发器在描述/地点/文件名变化时维护
+-- 查询直接使用 search_vector @@ ...，无需重复索引表达式
+DROP INDEX IF EXISTS idx_photos_caption_fts;
+DROP INDEX IF EXISTS idx_photos_fts;
+
+ALTER TABLE photos ADD COLUMN IF NOT EXISTS search_vector tsvector;
+COMMENT ON COLUMN photos.search_vector IS '全文搜索向量（caption/location/filename），由触发器维护';
+
+UPDATE photos 
+SET search_vector = to_tsvector('pg_catalog.simple', 
+    COALESCE(caption, '') || ' ' || COALESCE(location, '') || ' ' || COALESCE(filename, ''))
+WHERE search_vector IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_photos_search ON photos USING gin(search_vector);
+
+DROP TRIGGER IF EXISTS trg_photos_search_vector ON photos;
+CREATE TRIGGER trg_photos_search_vector
+BEFORE INSERT OR UPDATE OF caption, location, filename ON photos
+FOR EACH ROW
+EXECUTE FUNCTION tsvector_update_trigger(search_vector, 'pg_catalog.simple', caption, location, filename);
 
 -- 4.2 为标签名称创建全文搜索索引
 CREATE INDEX IF NOT EXISTS idx_tags_name_fts ON tags 
 USING gin(to_tsvector('simple', COALESCE(name, '') || ' ' || COALESCE(zh, '')));
 
+-- 4.3 为主色调创建三元组索引（颜色筛选使用 dominant_colors ILIKE ANY(...)）
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_photos_colors_trgm ON photos 
+USING gin(dominant_colors gin_trgm_ops);
+
+-- 为照片描述创建三元组索引（关键词搜索使用 caption ILIKE '%...%'）
+CREATE INDEX IF NOT EXISTS idx_photos_caption_trgm ON photos 
+USING gin(caption gin_trgm_ops);
+
+-- 4.4 EXIF 索引：jsonpath/键存在查询走 GIN，相机统计按表达式索引分组
+CREATE INDEX IF NOT EXISTS idx_photos_exif_gin ON photos USING gin(exif_data);
+CREATE INDEX IF NOT EXISTS idx_photos_exif_camera ON photos((exif_data ->> 'camera'));
+
+-- 4.5 用户名不区分大小写唯一（登录 WHERE lower(username) = ...）
+-- 已有仅大小写不同的重名用户时无法加唯一约束：保留普通索引并提示，人工合并后重新执行迁移
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM users GROUP BY lower(username) HAVING COUNT(*) > 1
+    ) THEN
+        RAISE NOTICE '存在仅大小写不同的重复用户名，idx_users_username_lower 暂不设为唯一';
+        CREATE INDEX IF NOT EXISTS idx_users_username_lower ON users(lower(username));
+    ELSIF NOT EXISTS (
+        SELECT 1 FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = 'idx_users_username_lower' AND i.indisunique
+    ) THEN
+        DROP INDEX IF EXISTS idx_users_username_lower;
+        CREATE UNIQUE INDEX idx_users_username_lower ON users(lower(username));
+    END IF;
+END $$;
+
 -- =====================================================
 -- 5. 创建用于统计的视图（可选）
 -- =====================================================
@@ -223,7 +276,7 @@ BEGIN
         p.created_at,
         (
             -- 计算相关性分数
-            ts_rank(to_tsvector('simple', COALESCE(p.caption, '')), plainto_tsquery('simple', p_search_text)) +
+            ts_rank(p.search_vector, plainto_tsquery('simple', p_search_text)) +
             COALESCE((
                 SELECT MAX(pt.confidence)
                 FROM photo_tags pt
@@ -235,7 +288,7 @@ BEGIN
     FROM photos p
     WHERE p.user_id = p_user_id
     AND (
-        to_tsvector('simple', COALESCE(p.caption, '')) @@ plainto_tsquery('simple', p_search_text)
+        p.search_vector @@ plainto_tsquery('simple', p_search_text)
         OR EXISTS (
             SELECT 1 FROM photo_tags pt
             JOIN tags t ON pt.tag_id = t.id
@@ -6,9 +6,9 @@ import sys
 import subprocess
 import logging
 import os
+from importlib.util import find_spec
 from pathlib import Path
 from dotenv import load_dotenv
-from logo import MomentoLogo
 
 # 加载环境变量
 load_dotenv()
@@ -85,9 +85,28 @@ def display_system_info():
     logger.info("=" * 70 + "\n")
 
 
+def run_database_setup():
+    """执行 setup_database.py"""
+    # 逐行转发子进程输出（setup_database 的日志写在 stderr，合并到 stdout），
+    # 长时间建索引时也能看到进度，且不在内存中积攒整段输出
+    proc = subprocess.Popen([sys.executable, 'setup_database.py'],
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            text=True, bufsize=1)
+    with proc.stdout:
+        for line in proc.stdout:
+            logger.info(f"   {line.rstrip()}")
+    
+    if proc.wait() == 0:
+        logger.info("✅ 数据库设置完成")
+    else:
+        logger.error("❌ 数据库设置失败，详见上方输出")
+        sys.exit(1)
+
+
 def main():
     """主函数"""
     # 显示Logo
+    from logo import MomentoLogo
     app_version = os.getenv("APP_VERSION", "1.0.0")
     MomentoLogo.print_banner(version=app_version, colored=True)
     
@@ -97,14 +116,13 @@ def main():
         sys.exit(1)
     logger.info(f"✅ Python版本: {sys.version.split()[0]}")
     
-    # 2. 检查依赖包
-    try:
-        import fastapi, uvicorn, sqlalchemy
-        logger.info("✅ 核心依赖包检查通过")
-    except ImportError as e:
-        logger.error(f"❌ 缺少依赖包: {e}")
+    # 2. 检查依赖包（只查找不导入，服务器在 uvicorn 子进程中才真正加载）
+    missing = [name for name in ('fastapi', 'uvicorn', 'sqlalchemy') if find_spec(name) is None]
+    if missing:
+        logger.error(f"❌ 缺少依赖包: {', '.join(missing)}")
         logger.info("请运行: pip install -r requirements.txt")
         sys.exit(1)
+    logger.info("✅ 核心依赖包检查通过")
     
     # 3. 显示系统配置信息
     display_system_info()
@@ -116,17 +134,14 @@ def main():
         Path(directory).mkdir(exist_ok=True)
     logger.info(f"✅ 目录创建完成: {', '.join(directories)}")
     
-    # 5. 设置数据库
+    # 5. 设置数据库（结构版本一致时跳过）
     try:
         logger.info("\n🗄️  设置数据库...")
-        result = subprocess.run([sys.executable, 'setup_database.py'], 
-                               capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            logger.info("✅ 数据库设置完成")
+        from setup_database import schema_is_current
+        if schema_is_current():
+            logger.info("✅ 数据库结构已是最新，跳过初始化")
         else:
-            logger.error(f"❌ 数据库设置失败: {result.stderr}")
-            sys.exit(1)
+            run_database_setup()
     except Exception as e:
         logger.error(f"❌ 数据库设置异常: {e}")
         sys.exit(1)
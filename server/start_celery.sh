@@ -8,4 +8,5 @@ echo "🔄 启动 Celery Worker..."
 source venv/bin/activate
 
 # 启动Celery Worker
-celery -A app.celery_app worker --loglevel=info --queues=photo_processing,ai_processing
+# -Ofair: 只把任务分给空闲的子进程，避免耗时长的照片任务阻塞已预取的其他任务
+celery -A app.celery_app worker --loglevel=info -Ofair --queues=photo_processing,ai_processing
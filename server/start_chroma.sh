@@ -0,0 +1,11 @@
+#!/bin/bash
+
+# ChromaDB 向量库服务启动脚本（API 与 Celery worker 以 CHROMA_MODE=http 连接）
+
+echo "🧠 启动 ChromaDB 服务..."
+
+# 激活虚拟环境
+source venv/bin/activate
+
+# 启动Chroma服务
+chroma run --path "${CHROMA_PERSIST_DIR:-./chroma_db}" --host 0.0.0.0 --port "${CHROMA_PORT:-8001}"
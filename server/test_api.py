@@ -2,51 +2,53 @@
 """
 API测试脚本 - 验证服务是否正常运行
 """
-import requests
-import json
+import asyncio
+import httpx
 
-def test_api():
-    """测试API端点"""
+async def test_api():
+    """测试API端点（三个请求并发发出，共用一个连接池）"""
     base_url = "http://localhost:8003"
     
     print("🧪 测试API端点...")
     print("=" * 50)
     
+    async with httpx.AsyncClient(base_url=base_url, timeout=5) as client:
+        health, docs, root = await asyncio.gather(
+            client.get("/health"),
+            client.get("/docs"),
+            client.get("/"),
+            return_exceptions=True
+        )
+    
     # 测试健康检查
-    try:
-        response = requests.get(f"{base_url}/health", timeout=5)
-        if response.status_code == 200:
-            print("✅ 健康检查: 通过")
-            print(f"   响应: {response.json()}")
-        else:
-            print(f"❌ 健康检查失败: {response.status_code}")
-    except Exception as e:
-        print(f"❌ 健康检查异常: {e}")
+    if isinstance(health, Exception):
+        print(f"❌ 健康检查异常: {health}")
+    elif health.status_code == 200:
+        print("✅ 健康检查: 通过")
+        print(f"   响应: {health.json()}")
+    else:
+        print(f"❌ 健康检查失败: {health.status_code}")
     
     print()
     
     # 测试API文档
-    try:
-        response = requests.get(f"{base_url}/docs", timeout=5)
-        if response.status_code == 200:
-            print("✅ API文档: 可访问")
-            print(f"   文档地址: {base_url}/docs")
-        else:
-            print(f"❌ API文档失败: {response.status_code}")
-    except Exception as e:
-        print(f"❌ API文档异常: {e}")
+    if isinstance(docs, Exception):
+        print(f"❌ API文档异常: {docs}")
+    elif docs.status_code == 200:
+        print("✅ API文档: 可访问")
+        print(f"   文档地址: {base_url}/docs")
+    else:
+        print(f"❌ API文档失败: {docs.status_code}")
     
     print()
     
     # 测试根路径
-    try:
-        response = requests.get(f"{base_url}/", timeout=5)
-        if response.status_code == 200:
-            print("✅ 根路径: 可访问")
-        else:
-            print(f"❌ 根路径失败: {response.status_code}")
-    except Exception as e:
-        print(f"❌ 根路径异常: {e}")
+    if isinstance(root, Exception):
+        print(f"❌ 根路径异常: {root}")
+    elif root.status_code == 200:
+        print("✅ 根路径: 可访问")
+    else:
+        print(f"❌ 根路径失败: {root.status_code}")
     
     print()
     print("🎯 测试完成！")
@@ -54,4 +56,4 @@ def test_api():
     print(f"🔧 健康检查: {base_url}/health")
 
 if __name__ == "__main__":
-    test_api()
+    asyncio.run(test_api())
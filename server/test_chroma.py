@@ -9,38 +9,45 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from app.services.vector_service import vector_service
 import numpy as np
 
+TEST_COUNT = 1000  # 测试向量条数
+TEST_QUERIES = 8  # 批量搜索的查询条数
+
 def test_chroma():
     """测试ChromaDB功能"""
     print("🔍 测试ChromaDB向量服务")
     print("=" * 40)
     
-    # 测试添加向量
-    test_embedding = np.random.rand(768).tolist()
-    metadata = {
-        "user_id": 1,
-        "filename": "test.jpg",
-        "caption": "测试图片"
-    }
+    # 测试批量添加向量（一次生成 (N, 768) 矩阵；用float32，与 _generate_embedding 的输出一致）
+    embeddings = np.random.random((TEST_COUNT, 768)).astype(np.float32)
+    items = [
+        (
+            photo_id,
+            embeddings[row],
+            {
+                "user_id": 1,
+                "filename": f"test_{photo_id}.jpg",
+                "caption": "测试图片"
+            }
+        )
+        for row, photo_id in enumerate(range(1, TEST_COUNT + 1))
+    ]
     
-    success = vector_service.add_photo_embedding(
-        photo_id=1,
-        embedding=test_embedding,
-        metadata=metadata
-    )
+    success = vector_service.add_photo_embeddings_batch(items)
     
     if success:
-        print("✅ 向量添加成功")
+        print(f"✅ 向量添加成功: {TEST_COUNT} 条")
     else:
         print("❌ 向量添加失败")
         return
     
-    # 测试搜索
-    similar = vector_service.search_similar_photos(
-        query_embedding=test_embedding,
-        limit=5
+    # 测试批量搜索（(B, 768) 查询矩阵一次查询）
+    results = vector_service.search_similar_photos_batch(
+        query_embeddings=embeddings[:TEST_QUERIES],
+        limit=5,
+        user_id=1
     )
     
-    print(f"🔍 找到 {len(similar)} 个相似结果")
+    print(f"🔍 {len(results)} 个查询共找到 {sum(len(similar) for similar in results)} 个相似结果")
     
     # 测试统计信息
     stats = vector_service.get_collection_stats()